@@ -14,13 +14,21 @@ import folium
 from streamlit_folium import st_folium
 from datetime import datetime, timedelta
 import random
+import secrets
 import os
+import time
+import threading
+from contextlib import contextmanager
+import zlib
+from bisect import bisect_left, bisect_right
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
 import io
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -37,7 +45,7 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
+CUSTOM_CSS = """
 <style>
     .stMetric {
         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
@@ -56,7 +64,10 @@ st.markdown("""
         font-weight: bold;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Re-emitted every run: elements not rendered during a rerun are dropped from the page
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
 
 # Michigan cities with coordinates
 MICHIGAN_CITIES = {
@@ -82,6 +93,13 @@ MICHIGAN_CITIES = {
     'Saginaw': {'lat': 43.4195, 'lng': -83.9508, 'median_price': 45000, 'appreciation': 18.5},
 }
 
+# Column (SoA) view of MICHIGAN_CITIES for vectorized gathers by city index;
+# the dict above stays the source of truth for existing lookups
+CITY_DF = pd.DataFrame.from_dict(MICHIGAN_CITIES, orient='index').reset_index(names='city')
+CITY_ARRS = {col: CITY_DF[col].to_numpy() for col in CITY_DF.columns}
+CITY_INDEX = {city: i for i, city in enumerate(CITY_ARRS['city'])}
+DEFAULT_CITY_DATA = {'median_price': 150000, 'appreciation': 8.0}
+
 PROPERTY_TYPES = ['Single Family', 'Multi-Family', 'Condo', 'Townhouse', 'Duplex']
 
 DISTRESS_SIGNALS = [
@@ -90,7 +108,16 @@ DISTRESS_SIGNALS = [
     'Divorce', 'Code Violations', 'Tired Landlord'
 ]
 
+# One bit per distress signal so a property's signals pack into a single uint32
+SIGNAL_BITS = {name: 1 << i for i, name in enumerate(DISTRESS_SIGNALS)}
+
 PIPELINE_STAGES = ['New Lead', 'Contacted', 'Qualified', 'Offer Made', 'Under Contract', 'Closed', 'Dead/Lost']
+PIPELINE_STAGE_INDEX = {stage: i for i, stage in enumerate(PIPELINE_STAGES)}
+
+TIER_EMOJI = {'HOT': '🔴', 'WARM': '🟠', 'NURTURE': '🔵', 'MONITOR': '⚪'}
+ALERT_PRIORITY_EMOJI = {'high': '🔴', 'medium': '🟡', 'low': '🟢'}
+HOT_QUEUE_LIMIT = 25
+SEARCH_PAGE_SIZE = 20
 
 STREET_NAMES = [
     'Main St', 'Oak Ave', 'Maple Dr', 'Washington Blvd', 'Jefferson Ave',
@@ -108,10 +135,45 @@ LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Mille
 # REALESTATEAPI.COM INTEGRATION
 # ============================================================================
 
+class RateLimiter:
+    """Token bucket shared by every RealEstateAPI client"""
+    
+    def __init__(self, rate_per_sec):
+        self.rate = rate_per_sec
+        self.capacity = rate_per_sec
+        self.tokens = float(rate_per_sec)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a request token is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+    
+    def pause(self, seconds):
+        """Hold back all requests for the given number of seconds"""
+        with self.lock:
+            self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+@st.cache_resource
+def get_rate_limiter():
+    return RateLimiter(RealEstateAPI.RATE_LIMIT_PER_SEC)
+
 class RealEstateAPI:
     """Integration with RealEstateAPI.com"""
     
     BASE_URL = "https://api.realestateapi.com/v2"
+    RATE_LIMIT_PER_SEC = 10
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    MAX_ATTEMPTS = 6
     
     def __init__(self, api_key):
         self.api_key = api_key
@@ -119,17 +181,40 @@ class RealEstateAPI:
             "x-api-key": api_key,
             "Content-Type": "application/json"
         }
-    
-    def property_search(self, params):
-        """Search for properties with given parameters"""
-        try:
-            response = requests.post(
-                f"{self.BASE_URL}/PropertySearch",
-                headers=self.headers,
-                json=params,
+        self.limiter = get_rate_limiter()
+        # Keep-alive session reused across calls; retries stay in _post
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+    
+    def _post(self, endpoint, payload):
+        """POST through the shared rate limiter, retrying 429/5xx with exponential backoff"""
+        for attempt in range(self.MAX_ATTEMPTS):
+            self.limiter.acquire()
+            response = self.session.post(
+                f"{self.BASE_URL}/{endpoint}",
+                json=payload,
                 timeout=30
             )
             
+            try:
+                retry_after = float(response.headers.get('Retry-After'))
+            except (TypeError, ValueError):
+                retry_after = None
+            if response.headers.get('X-RateLimit-Remaining') == '0':
+                self.limiter.pause(retry_after or 1)
+            
+            if response.status_code not in self.RETRY_STATUSES or attempt == self.MAX_ATTEMPTS - 1:
+                return response
+            
+            # Honour Retry-After when given, otherwise full-jitter backoff between 1 and 60 s
+            delay = retry_after if retry_after is not None else random.uniform(0, 2 ** attempt)
+            time.sleep(min(60, max(1, delay)))
+    
+    def _search(self, params):
+        """Uncached PropertySearch request"""
+        try:
+            response = self._post("PropertySearch", params)
+            
             if response.status_code != 200:
                 return {
                     "error": f"API returned status {response.status_code}: {response.text[:500]}",
@@ -140,35 +225,86 @@ class RealEstateAPI:
         except requests.exceptions.RequestException as e:
             return {"error": str(e), "data": []}
     
-    def property_detail(self, property_id):
-        """Get detailed info for a specific property"""
+    def _detail(self, property_id):
+        """Uncached PropertyDetail request"""
         try:
-            response = requests.post(
-                f"{self.BASE_URL}/PropertyDetail",
-                headers=self.headers,
-                json={"id": property_id},
-                timeout=30
-            )
+            response = self._post("PropertyDetail", {"id": property_id})
             if response.status_code == 200:
                 return response.json()
             return {"error": f"Status {response.status_code}"}
         except requests.exceptions.RequestException as e:
             return {"error": str(e)}
     
-    def skip_trace(self, property_id):
-        """Get owner contact information"""
+    def _skip_trace(self, property_id):
+        """Uncached SkipTrace request"""
         try:
-            response = requests.post(
-                f"{self.BASE_URL}/SkipTrace",
-                headers=self.headers,
-                json={"id": property_id},
-                timeout=30
-            )
+            response = self._post("SkipTrace", {"id": property_id})
             if response.status_code == 200:
                 return response.json()
             return {"error": f"Status {response.status_code}"}
         except requests.exceptions.RequestException as e:
             return {"error": str(e)}
+    
+    def property_search(self, params):
+        """Search for properties with given parameters (cached for 15 minutes)"""
+        try:
+            return _cached_property_search(self.api_key, json.dumps(params, sort_keys=True))
+        except APIError as e:
+            return e.result
+    
+    def property_detail(self, property_id):
+        """Get detailed info for a specific property (cached for 15 minutes)"""
+        try:
+            return _cached_property_detail(self.api_key, property_id)
+        except APIError as e:
+            return e.result
+    
+    def skip_trace(self, property_id):
+        """Get owner contact information (cached for 15 minutes)"""
+        try:
+            return _cached_skip_trace(self.api_key, property_id)
+        except APIError as e:
+            return e.result
+
+class APIError(Exception):
+    """Error payload raised out of the cached calls so failures are never cached"""
+    
+    def __init__(self, result):
+        super().__init__(result.get('error'))
+        self.result = result
+
+def _raise_on_error(result):
+    if 'error' in result:
+        raise APIError(result)
+    return result
+
+@st.cache_resource
+def get_api(api_key):
+    """One RealEstateAPI client per key, reused across reruns"""
+    return RealEstateAPI(api_key)
+
+@st.cache_data(ttl=900, show_spinner=False)
+def _cached_property_search(api_key, params_json):
+    return _raise_on_error(get_api(api_key)._search(json.loads(params_json)))
+
+@st.cache_data(ttl=900, show_spinner=False)
+def _cached_property_detail(api_key, property_id):
+    return _raise_on_error(get_api(api_key)._detail(property_id))
+
+@st.cache_data(ttl=900, show_spinner=False)
+def _cached_skip_trace(api_key, property_id):
+    return _raise_on_error(get_api(api_key)._skip_trace(property_id))
+
+def extract_api_rows(results):
+    """Pull the property list out of a search response, whatever key it is under"""
+    if not results:
+        return None
+    if isinstance(results, list):
+        return results
+    for key in ('data', 'results', 'properties'):
+        if results.get(key):
+            return results[key]
+    return None
 
 # ============================================================================
 # DATABASE SETUP
@@ -177,9 +313,51 @@ class RealEstateAPI:
 def get_db_path():
     return 'flipfinder.db'
 
+def open_conn():
+    """Open a SQLite connection tuned for the app's read/write mix"""
+    # Every query text is drawn from a fixed set (parameters are always bound),
+    # so a roomy statement cache means each one is only prepared once
+    conn = sqlite3.connect(get_db_path(), check_same_thread=False, cached_statements=256)
+    # WAL lets dashboard reads proceed while a write is in flight, and with
+    # synchronous=NORMAL a commit no longer fsyncs the main database file
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA wal_autocheckpoint=1000")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA mmap_size=268435456")
+    return conn
+
+# Reads get a connection per thread, so WAL can run them side by side. Streamlit gives
+# every script run its own thread; two live threads never share an ident, and a new
+# thread that reuses a finished one's ident picks up its already-open connection
+@st.cache_resource(max_entries=32)
+def get_read_conn(thread_id):
+    """Read connection owned by one thread"""
+    return open_conn()
+
+def get_conn():
+    """Read connection for the calling thread, reused across reruns"""
+    return get_read_conn(threading.get_ident())
+
+# Writes share one connection, so each transaction has to own it from BEGIN to COMMIT
+@st.cache_resource
+def get_writer():
+    """The write connection and the lock that serialises its transactions"""
+    return open_conn(), threading.Lock()
+
+@contextmanager
+def write_conn():
+    """Run the block as one transaction on the write connection"""
+    conn, lock = get_writer()
+    with lock, conn:
+        yield conn
+
+@st.cache_resource
 def init_database():
-    """Initialize SQLite database"""
-    conn = sqlite3.connect(get_db_path())
+    """Initialize SQLite database (once per process)"""
+    conn = get_conn()
     c = conn.cursor()
     
     c.execute('''CREATE TABLE IF NOT EXISTS properties (
@@ -250,8 +428,20 @@ def init_database():
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )''')
     
+    c.execute("CREATE INDEX IF NOT EXISTS idx_props_updated ON properties(updated_at)")
+    # List pages filter on one of city/tier/stage and page by (score, id): (filter, score, id)
+    # serves the WHERE, the keyset cursor and the ORDER BY ... LIMIT without a temp sort
+    c.execute("CREATE INDEX IF NOT EXISTS idx_props_city_rank ON properties(city, COALESCE(priority_score, 0) DESC, id DESC)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_props_tier_rank ON properties(priority_tier, COALESCE(priority_score, 0) DESC, id DESC)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_props_stage_rank ON properties(stage, COALESCE(priority_score, 0) DESC, id DESC)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_props_latlng ON properties(lat, lng)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_props_rank ON properties(COALESCE(priority_score, 0) DESC, id DESC)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_alerts_read_created ON alerts(read, created_at DESC)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_followups_prop ON followups(property_id, date DESC)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_notes_prop ON notes(property_id, created_at DESC)")
+    
     conn.commit()
-    conn.close()
+    c.execute("ANALYZE")
 
 # ============================================================================
 # MOCK DATA GENERATOR
@@ -259,138 +449,228 @@ def init_database():
 
 def generate_mock_properties(count=50):
     """Generate realistic mock properties for Michigan"""
-    properties = []
-    
-    for i in range(count):
-        city = random.choice(list(MICHIGAN_CITIES.keys()))
-        city_data = MICHIGAN_CITIES[city]
-        
-        beds = random.choices([2, 3, 4, 5], weights=[15, 45, 30, 10])[0]
-        baths = random.choices([1, 1.5, 2, 2.5, 3], weights=[10, 20, 40, 20, 10])[0]
-        sqft = random.randint(800, 3500)
-        year_built = random.randint(1920, 2015)
-        lot_size = round(random.uniform(0.1, 0.8), 2)
-        
-        base_price = city_data['median_price']
-        price_variance = random.uniform(0.5, 1.5)
-        sqft_factor = sqft / 1500
-        list_price = int(base_price * price_variance * sqft_factor)
-        
-        num_signals = random.choices([0, 1, 2, 3, 4, 5], weights=[20, 25, 25, 15, 10, 5])[0]
-        signals = random.sample(DISTRESS_SIGNALS, min(num_signals, len(DISTRESS_SIGNALS)))
-        
-        ownership_years = random.randint(1, 30)
-        if ownership_years > 15:
-            equity_percent = random.randint(70, 100)
-        elif ownership_years > 7:
-            equity_percent = random.randint(40, 80)
-        else:
-            equity_percent = random.randint(10, 50)
-        
-        if 'Foreclosure' in signals or 'Pre-Foreclosure' in signals:
-            days_on_market = random.randint(60, 180)
-        else:
-            days_on_market = random.randint(5, 120)
-        
-        price_reductions = random.choices([0, 1, 2, 3], weights=[50, 30, 15, 5])[0]
-        
-        street_num = random.randint(100, 9999)
-        street = random.choice(STREET_NAMES)
-        address = f"{street_num} {street}"
-        
-        owner_name = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}"
-        
-        lat = city_data['lat'] + random.uniform(-0.05, 0.05)
-        lng = city_data['lng'] + random.uniform(-0.05, 0.05)
-        
-        has_phone = random.random() > 0.3
-        phone = f"({random.randint(200,999)}) {random.randint(200,999)}-{random.randint(1000,9999)}" if has_phone else ""
-        
-        has_email = random.random() > 0.5
-        email_domains = ['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com']
-        email = f"{owner_name.lower().replace(' ', '.')}@{random.choice(email_domains)}" if has_email else ""
-        
-        prop = {
-            'id': f"prop_{i+1:04d}",
-            'address': address,
-            'city': city,
-            'state': 'MI',
-            'zip': f"48{random.randint(100, 999)}",
-            'beds': beds,
-            'baths': baths,
-            'sqft': sqft,
-            'year_built': year_built,
-            'lot_size': lot_size,
-            'property_type': random.choice(PROPERTY_TYPES),
-            'list_price': list_price,
-            'estimated_value': int(list_price * random.uniform(0.95, 1.1)),
-            'arv': int(list_price * random.uniform(1.15, 1.4)),
-            'equity_percent': equity_percent,
-            'mortgage_balance': int(list_price * (100 - equity_percent) / 100),
-            'equity': int(list_price * equity_percent / 100),
-            'days_on_market': days_on_market,
-            'price_reductions': price_reductions,
-            'ownership_years': ownership_years,
-            'distress_signals': signals,
-            'owner_name': owner_name,
-            'owner_phone': phone,
-            'owner_email': email,
-            'owner_mailing': f"{random.randint(100, 9999)} {random.choice(STREET_NAMES)}, {city}, MI",
-            'lat': lat,
-            'lng': lng,
-            'stage': random.choices(PIPELINE_STAGES, weights=[40, 20, 15, 10, 8, 5, 2])[0],
-        }
-        
-        properties.append(prop)
+    rng = np.random.default_rng()
+
+    def weighted(options, weights):
+        p = np.asarray(weights, dtype=float)
+        return rng.choice(options, size=count, p=p / p.sum())
+
+    city_idx = rng.integers(0, len(CITY_DF), size=count)
+    city = CITY_ARRS['city'][city_idx]
+    city_lat = CITY_ARRS['lat'][city_idx]
+    city_lng = CITY_ARRS['lng'][city_idx]
+    base_price = CITY_ARRS['median_price'][city_idx]
+
+    beds = weighted([2, 3, 4, 5], [15, 45, 30, 10])
+    baths = weighted([1, 1.5, 2, 2.5, 3], [10, 20, 40, 20, 10])
+    sqft = rng.integers(800, 3501, size=count)
+    year_built = rng.integers(1920, 2016, size=count)
+    lot_size = rng.uniform(0.1, 0.8, size=count).round(2)
+
+    price_variance = rng.uniform(0.5, 1.5, size=count)
+    list_price = (base_price * price_variance * (sqft / 1500)).astype(np.int64)
+
+    # Random sample of distress signals without replacement: take the first
+    # num_signals entries of an independent permutation per row
+    num_signals = weighted([0, 1, 2, 3, 4, 5], [20, 25, 25, 15, 10, 5])
+    signal_order = rng.random((count, len(DISTRESS_SIGNALS))).argsort(axis=1)
+    signals = [[DISTRESS_SIGNALS[j] for j in order[:k]] for order, k in zip(signal_order, num_signals)]
+    in_foreclosure = np.array(['Foreclosure' in s or 'Pre-Foreclosure' in s for s in signals], dtype=bool)
+
+    ownership_years = rng.integers(1, 31, size=count)
+    equity_percent = np.select(
+        [ownership_years > 15, ownership_years > 7],
+        [rng.integers(70, 101, size=count), rng.integers(40, 81, size=count)],
+        default=rng.integers(10, 51, size=count)
+    )
+
+    days_on_market = np.where(in_foreclosure, rng.integers(60, 181, size=count), rng.integers(5, 121, size=count))
+    price_reductions = weighted([0, 1, 2, 3], [50, 30, 15, 5])
+
+    address = [f"{n} {s}" for n, s in zip(rng.integers(100, 10000, size=count), rng.choice(STREET_NAMES, size=count))]
+    owner_name = [f"{f} {l}" for f, l in zip(rng.choice(FIRST_NAMES, size=count), rng.choice(LAST_NAMES, size=count))]
+
+    lat = city_lat + rng.uniform(-0.05, 0.05, size=count)
+    lng = city_lng + rng.uniform(-0.05, 0.05, size=count)
+
+    has_phone = rng.random(count) > 0.3
+    phone_parts = zip(has_phone, rng.integers(200, 1000, size=count), rng.integers(200, 1000, size=count),
+                      rng.integers(1000, 10000, size=count))
+    phone = [f"({a}) {b}-{c}" if ok else "" for ok, a, b, c in phone_parts]
+
+    has_email = rng.random(count) > 0.5
+    email_domains = ['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com']
+    email = [f"{name.lower().replace(' ', '.')}@{domain}" if ok else ""
+             for ok, name, domain in zip(has_email, owner_name, rng.choice(email_domains, size=count))]
+
+    mailing = [f"{n} {s}, {c}, MI" for n, s, c in zip(rng.integers(100, 10000, size=count),
+                                                       rng.choice(STREET_NAMES, size=count), city)]
+
+    df = pd.DataFrame({
+        'id': [f"prop_{i+1:04d}" for i in range(count)],
+        'address': address,
+        'city': city,
+        'state': 'MI',
+        'zip': [f"48{z}" for z in rng.integers(100, 1000, size=count)],
+        'beds': beds,
+        'baths': baths,
+        'sqft': sqft,
+        'year_built': year_built,
+        'lot_size': lot_size,
+        'property_type': rng.choice(PROPERTY_TYPES, size=count),
+        'list_price': list_price,
+        'estimated_value': (list_price * rng.uniform(0.95, 1.1, size=count)).astype(np.int64),
+        'equity_percent': equity_percent,
+        'mortgage_balance': (list_price * (100 - equity_percent) / 100).astype(np.int64),
+        'equity': (list_price * equity_percent / 100).astype(np.int64),
+        'days_on_market': days_on_market,
+        'price_reductions': price_reductions,
+        'ownership_years': ownership_years,
+        'distress_signals': signals,
+        'owner_name': owner_name,
+        'owner_phone': phone,
+        'owner_email': email,
+        'owner_mailing': mailing,
+        'lat': lat,
+        'lng': lng,
+        'stage': weighted(PIPELINE_STAGES, [40, 20, 15, 10, 8, 5, 2]),
+    })
+    df.insert(df.columns.get_loc('estimated_value') + 1, 'arv', predict_arv_bulk(df)['predicted_arv'])
     
-    return properties
+    return df
 
 def load_mock_data():
     """Load mock data into database if empty"""
-    conn = sqlite3.connect(get_db_path())
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM properties")
-    count = c.fetchone()[0]
-    conn.close()
-    
-    if count == 0:
-        properties = generate_mock_properties(50)
-        for prop in properties:
-            priority = calculate_ai_priority_score(prop)
-            neighborhood = analyze_neighborhood(prop['city'])
-            prop['neighborhood_score'] = neighborhood['score']
-            save_property(prop, priority)
-        
-        generate_mock_alerts()
+    conn = get_conn()
+    # Existence probe stops at the first row; COUNT(*) would walk the whole table
+    has_rows = conn.execute("SELECT 1 FROM properties LIMIT 1").fetchone()
+    
+    if not has_rows:
+        df = generate_mock_properties(50)
+        scores = score_properties_bulk(df)
+        df = df.assign(
+            distress_signals=df['distress_signals'].map(dump_signals),
+            priority_score=scores['score'],
+            priority_tier=scores['tier'],
+            neighborhood_score=analyze_neighborhoods(df['city'])['score'].to_numpy(),
+            updated_at=datetime.now().isoformat(),
+        )
+
+        # One transaction for the whole demo data set instead of a commit per row
+        with write_conn() as writer:
+            writer.executemany(PROPERTY_INSERT_SQL, df[PROPERTY_COLUMNS].itertuples(index=False, name=None))
+            writer.executemany(ALERT_INSERT_SQL, MOCK_ALERTS)
+        get_alerts.clear()
+        get_unread_alert_count.clear()
+
+        # init_database analyzed an empty table; refresh stats so the planner sees real row counts
+        with write_conn() as writer:
+            writer.execute("ANALYZE")
+
+        # Fold the bulk load back into the main file so the WAL doesn't linger
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
         return True
     return False
 
-def generate_mock_alerts():
-    """Generate mock alerts"""
-    conn = sqlite3.connect(get_db_path())
-    c = conn.cursor()
-    
-    alerts = [
-        ('hot_lead', None, '🔥 New Hot Lead!', 'Property at 1234 Oak Ave in Detroit scored 92/100', 'high'),
-        ('price_drop', None, '📉 Price Dropped 15%', '5678 Maple Dr reduced from $150,000 to $127,500', 'high'),
-        ('new_listing', None, '🏠 New Pre-Foreclosure', 'Pre-foreclosure property listed in Flint under $50k', 'medium'),
-        ('followup', None, '📞 Follow-up Due', 'Call scheduled for John Smith at 2:00 PM today', 'medium'),
-        ('market', None, '📈 Market Update', 'Detroit median prices up 8.5% this quarter', 'low'),
-    ]
-    
-    for alert in alerts:
-        c.execute('''INSERT INTO alerts (type, property_id, title, message, priority)
-                     VALUES (?, ?, ?, ?, ?)''', alert)
-    
-    conn.commit()
-    conn.close()
+ALERT_INSERT_SQL = "INSERT INTO alerts (type, property_id, title, message, priority) VALUES (?, ?, ?, ?, ?)"
+
+MOCK_ALERTS = [
+    ('hot_lead', None, '🔥 New Hot Lead!', 'Property at 1234 Oak Ave in Detroit scored 92/100', 'high'),
+    ('price_drop', None, '📉 Price Dropped 15%', '5678 Maple Dr reduced from $150,000 to $127,500', 'high'),
+    ('new_listing', None, '🏠 New Pre-Foreclosure', 'Pre-foreclosure property listed in Flint under $50k', 'medium'),
+    ('followup', None, '📞 Follow-up Due', 'Call scheduled for John Smith at 2:00 PM today', 'medium'),
+    ('market', None, '📈 Market Update', 'Detroit median prices up 8.5% this quarter', 'low'),
+]
 
 # ============================================================================
 # AI-ENHANCED FEATURES
 # ============================================================================
 
-def calculate_ai_priority_score(property_data):
-    """AI-Enhanced Priority Scoring System"""
+# Seller-motivation signals: (points, factor name, insight or None), in display order
+SIGNAL_RULES = {
+    'Foreclosure': (15, "🚨 Active Foreclosure", "🔥 URGENT - Facing sale deadline!"),
+    'Pre-Foreclosure': (12, "⚠️ Pre-Foreclosure", None),
+    'Probate/Estate': (12, "📜 Inherited/Estate", None),
+    'Tax Lien': (10, "💸 Tax Lien", None),
+    'Divorce': (10, "💔 Divorce", None),
+    'Absentee Owner': (6, "📍 Absentee Owner", None),
+    'Vacant': (8, "🏚️ Vacant Property", None),
+    'Tired Landlord': (8, "😫 Tired Landlord", None),
+}
+SIGNAL_POINTS = {name: rule[0] for name, rule in SIGNAL_RULES.items()}
+
+# Score ladders: (threshold, points, factor name, category), highest rung first.
+# Only the first rung a value reaches scores; shared by both scorers.
+SCORE_LADDERS = {
+    'gap_percent': [
+        (15, 25, "🎯 Excellent Price Gap (15%+)", "profit"),
+        (10, 20, "Great Price Gap (10%+)", "profit"),
+        (5, 15, "Good Price Gap (5%+)", "profit"),
+        (0, 10, "At Max Offer", "profit"),
+        (-10, 5, "Negotiable", "profit"),
+    ],
+    'roi': [
+        (30, 15, "🚀 Excellent ROI (30%+)", "profit"),
+        (20, 12, "Strong ROI (20%+)", "profit"),
+        (15, 8, "Good ROI (15%+)", "profit"),
+    ],
+    'signal_count': [
+        (5, 8, "🔥 5+ Distress Signals", "motivation"),
+        (3, 5, "Multiple Signals", "motivation"),
+    ],
+    'days_on_market': [
+        (90, 8, "📅 Stale Listing (90+ days)", "urgency"),
+        (60, 5, "Getting Stale (60+ days)", "urgency"),
+    ],
+    'price_reductions': [
+        (2, 8, "📉 Multiple Price Drops", "urgency"),
+        (1, 5, "Price Reduced", "urgency"),
+    ],
+}
+
+def compile_ladder(ladder):
+    """Ascending thresholds, matching rungs and a points table (0 for below every rung)"""
+    rungs = sorted(ladder, key=lambda rung: rung[0])
+    return [rung[0] for rung in rungs], rungs, np.array([0] + [rung[1] for rung in rungs])
+
+# Reaching a rung means value >= threshold, so bisect_right over the ascending
+# thresholds gives the index of the highest rung reached in one lookup
+LADDER_TABLES = {key: compile_ladder(ladder) for key, ladder in SCORE_LADDERS.items()}
+
+def ladder_factor(value, key):
+    """Highest rung of a score ladder that value reaches, as a factor dict"""
+    thresholds, rungs, _ = LADDER_TABLES[key]
+    i = bisect_right(thresholds, value)
+    if i == 0 or value != value:
+        return None
+    _, points, name, category = rungs[i - 1]
+    return {"name": name, "points": points, "category": category}
+
+def ladder_points(values, key):
+    """Vectorized ladder_factor points for a NumPy array"""
+    thresholds, _, points = LADDER_TABLES[key]
+    idx = np.searchsorted(thresholds, values, side='right')
+    return np.where(np.isnan(values), 0, points[idx])
+
+# Repair budget by home age: (age above, $/sqft, insight), youngest first
+REPAIR_TIERS = [
+    (15, 30, "✅ Newer construction - mostly cosmetic"),
+    (30, 45, "🔧 Medium-age home - likely needs updates"),
+    (50, 65, "🔧 Older home - budget for major systems"),
+]
+REPAIR_AGES = [tier[0] for tier in REPAIR_TIERS]
+REPAIR_RATES = np.array([20] + [tier[1] for tier in REPAIR_TIERS])
+REPAIR_INSIGHTS = ["✅ Very new - minimal repairs expected"] + [tier[2] for tier in REPAIR_TIERS]
+
+def encode_signal_mask(distress_signals):
+    """Pack a list of distress signals into a SIGNAL_BITS mask"""
+    mask = 0
+    for signal in distress_signals or []:
+        mask |= SIGNAL_BITS.get(signal, 0)
+    return mask
+
+def calculate_ai_priority_score(property_data, now=None):
+    """AI-Enhanced Priority Scoring System; pass now to score a batch against one clock read"""
     score = 0
     factors = []
     ai_insights = []
@@ -404,26 +684,15 @@ def calculate_ai_priority_score(property_data):
     ownership_years = property_data.get('ownership_years', 5)
     days_on_market = property_data.get('days_on_market', 0)
     price_reductions = property_data.get('price_reductions', 0)
-    distress_signals = property_data.get('distress_signals', [])
-    
-    if isinstance(distress_signals, str):
-        distress_signals = distress_signals.split(',') if distress_signals else []
-    
-    current_year = datetime.now().year
-    age = current_year - year_built if year_built > 1800 else 50
-    
-    if age > 50:
-        repair_per_sqft = 65
-        ai_insights.append("🔧 Older home - budget for major systems")
-    elif age > 30:
-        repair_per_sqft = 45
-        ai_insights.append("🔧 Medium-age home - likely needs updates")
-    elif age > 15:
-        repair_per_sqft = 30
-        ai_insights.append("✅ Newer construction - mostly cosmetic")
-    else:
-        repair_per_sqft = 20
-        ai_insights.append("✅ Very new - minimal repairs expected")
+    distress_signals = property_data.get('distress_signals', []) or []
+    
+    now = now or datetime.now()
+    age = now.year - year_built if year_built > 1800 else 50
+    
+    # Strictly older than a tier's age: bisect_left counts the ages below it
+    repair_tier = bisect_left(REPAIR_AGES, age)
+    repair_per_sqft = int(REPAIR_RATES[repair_tier])
+    ai_insights.append(REPAIR_INSIGHTS[repair_tier])
     
     estimated_repairs = sqft * repair_per_sqft
     max_offer = (arv * 0.7) - estimated_repairs
@@ -434,67 +703,27 @@ def calculate_ai_priority_score(property_data):
     net_profit = arv - total_investment
     roi = (net_profit / total_investment * 100) if total_investment > 0 else 0
     
+    def add_ladder(key, value):
+        nonlocal score
+        factor = ladder_factor(value, key)
+        if factor:
+            score += factor['points']
+            factors.append(factor)
+    
     # PROFIT POTENTIAL (0-40)
-    if gap_percent >= 15:
-        score += 25
-        factors.append({"name": "🎯 Excellent Price Gap (15%+)", "points": 25, "category": "profit"})
+    add_ladder('gap_percent', gap_percent)
+    if gap_percent >= SCORE_LADDERS['gap_percent'][0][0]:
         ai_insights.append("💰 SLAM DUNK - Priced below max offer!")
-    elif gap_percent >= 10:
-        score += 20
-        factors.append({"name": "Great Price Gap (10%+)", "points": 20, "category": "profit"})
-    elif gap_percent >= 5:
-        score += 15
-        factors.append({"name": "Good Price Gap (5%+)", "points": 15, "category": "profit"})
-    elif gap_percent >= 0:
-        score += 10
-        factors.append({"name": "At Max Offer", "points": 10, "category": "profit"})
-    elif gap_percent >= -10:
-        score += 5
-        factors.append({"name": "Negotiable", "points": 5, "category": "profit"})
-    
-    if roi >= 30:
-        score += 15
-        factors.append({"name": "🚀 Excellent ROI (30%+)", "points": 15, "category": "profit"})
-    elif roi >= 20:
-        score += 12
-        factors.append({"name": "Strong ROI (20%+)", "points": 12, "category": "profit"})
-    elif roi >= 15:
-        score += 8
-        factors.append({"name": "Good ROI (15%+)", "points": 8, "category": "profit"})
+    add_ladder('roi', roi)
     
     # SELLER MOTIVATION (0-35)
-    if 'Foreclosure' in distress_signals:
-        score += 15
-        factors.append({"name": "🚨 Active Foreclosure", "points": 15, "category": "motivation"})
-        ai_insights.append("🔥 URGENT - Facing sale deadline!")
-    
-    if 'Pre-Foreclosure' in distress_signals:
-        score += 12
-        factors.append({"name": "⚠️ Pre-Foreclosure", "points": 12, "category": "motivation"})
-    
-    if 'Probate/Estate' in distress_signals:
-        score += 12
-        factors.append({"name": "📜 Inherited/Estate", "points": 12, "category": "motivation"})
-    
-    if 'Tax Lien' in distress_signals:
-        score += 10
-        factors.append({"name": "💸 Tax Lien", "points": 10, "category": "motivation"})
-    
-    if 'Divorce' in distress_signals:
-        score += 10
-        factors.append({"name": "💔 Divorce", "points": 10, "category": "motivation"})
-    
-    if 'Absentee Owner' in distress_signals:
-        score += 6
-        factors.append({"name": "📍 Absentee Owner", "points": 6, "category": "motivation"})
-    
-    if 'Vacant' in distress_signals:
-        score += 8
-        factors.append({"name": "🏚️ Vacant Property", "points": 8, "category": "motivation"})
-    
-    if 'Tired Landlord' in distress_signals:
-        score += 8
-        factors.append({"name": "😫 Tired Landlord", "points": 8, "category": "motivation"})
+    sig_bits = encode_signal_mask(distress_signals)
+    for name, (points, label, insight) in SIGNAL_RULES.items():
+        if sig_bits & SIGNAL_BITS[name]:
+            score += points
+            factors.append({"name": label, "points": points, "category": "motivation"})
+            if insight:
+                ai_insights.append(insight)
     
     if ownership_years >= 15:
         score += 5
@@ -508,31 +737,14 @@ def calculate_ai_priority_score(property_data):
         score += 5
         factors.append({"name": "🆓 Free & Clear", "points": 5, "category": "motivation"})
     
-    signal_count = len([s for s in distress_signals if s])
-    if signal_count >= 5:
-        score += 8
-        factors.append({"name": "🔥 5+ Distress Signals", "points": 8, "category": "motivation"})
-    elif signal_count >= 3:
-        score += 5
-        factors.append({"name": "Multiple Signals", "points": 5, "category": "motivation"})
+    signal_count = sum(1 for s in distress_signals if s)
+    add_ladder('signal_count', signal_count)
     
     # URGENCY (0-15)
-    if days_on_market >= 90:
-        score += 8
-        factors.append({"name": "📅 Stale Listing (90+ days)", "points": 8, "category": "urgency"})
-    elif days_on_market >= 60:
-        score += 5
-        factors.append({"name": "Getting Stale (60+ days)", "points": 5, "category": "urgency"})
+    add_ladder('days_on_market', days_on_market)
+    add_ladder('price_reductions', price_reductions)
     
-    if price_reductions >= 2:
-        score += 8
-        factors.append({"name": "📉 Multiple Price Drops", "points": 8, "category": "urgency"})
-    elif price_reductions >= 1:
-        score += 5
-        factors.append({"name": "Price Reduced", "points": 5, "category": "urgency"})
-    
-    current_month = datetime.now().month
-    if current_month in [11, 12, 1, 2]:
+    if now.month in [11, 12, 1, 2]:
         score += 3
         factors.append({"name": "❄️ Winter Season", "points": 3, "category": "urgency"})
     
@@ -590,118 +802,269 @@ def calculate_ai_priority_score(property_data):
         }
     }
 
-def predict_arv(property_data, city):
-    """AI-powered ARV prediction"""
-    city_data = MICHIGAN_CITIES.get(city, {'median_price': 150000, 'appreciation': 8.0})
-    
-    sqft = property_data.get('sqft', 1500)
-    beds = property_data.get('beds', 3)
-    baths = property_data.get('baths', 2)
-    year_built = property_data.get('year_built', 1970)
-    list_price = property_data.get('list_price', city_data['median_price'])
-    
-    price_per_sqft = city_data['median_price'] / 1500
+@st.cache_data(ttl=24*3600, max_entries=4096, show_spinner=False)
+def load_priority_score(prop_id, updated_at, period, _property_data):
+    """Priority score for one stored version of a property"""
+    return calculate_ai_priority_score(_property_data)
+
+def get_priority_score(property_data):
+    """Priority score, reused while the property row is unchanged"""
+    if not property_data.get('id') or not property_data.get('updated_at'):
+        return calculate_ai_priority_score(property_data)
+    # The winter-season bonus and age come from today's date, so the month is part of the key
+    return load_priority_score(
+        property_data['id'], property_data['updated_at'], datetime.now().strftime('%Y-%m'), property_data
+    )
+
+def score_properties_bulk(df):
+    """Vectorized priority scoring for a whole DataFrame of properties.
+
+    Produces the same score, tier and financials as calculate_ai_priority_score
+    but without the per-row factor/insight lists, so it is the path to use for
+    bulk loads and re-scoring.
+    """
+    def col(name, default):
+        if name not in df:
+            return pd.Series(default, index=df.index, dtype=float)
+        return pd.to_numeric(df[name], errors='coerce').fillna(default).astype(float)
+
+    def has_text(name):
+        if name not in df:
+            return np.zeros(len(df), dtype=bool)
+        return df[name].fillna('').astype(str).str.len().to_numpy() > 0
+
+    now = datetime.now()
+    list_price = col('list_price', 0).to_numpy()
+    arv = col('arv', 0).to_numpy()
+    arv = np.where(arv != 0, arv, np.trunc(list_price * 1.2))
+    sqft = col('sqft', 1500).to_numpy()
+    year_built = col('year_built', 1970).to_numpy()
+    equity_percent = col('equity_percent', 0).to_numpy()
+    ownership_years = col('ownership_years', 5).to_numpy()
+    days_on_market = col('days_on_market', 0).to_numpy()
+    price_reductions = col('price_reductions', 0).to_numpy()
+
+    age = np.where(year_built > 1800, now.year - year_built, 50)
+    repair_per_sqft = REPAIR_RATES[np.searchsorted(REPAIR_AGES, age, side='left')]
+    estimated_repairs = sqft * repair_per_sqft
+    max_offer = (arv * 0.7) - estimated_repairs
+    gap = max_offer - list_price
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gap_percent = np.where(arv > 0, gap / arv * 100, 0.0)
+        total_investment = list_price + estimated_repairs + (arv * 0.13)
+        net_profit = arv - total_investment
+        roi = np.where(total_investment > 0, net_profit / total_investment * 100, 0.0)
+
+    # PROFIT POTENTIAL
+    score = ladder_points(gap_percent, 'gap_percent')
+    score += ladder_points(roi, 'roi')
+
+    # SELLER MOTIVATION
+    signals = df['distress_signals'] if 'distress_signals' in df else pd.Series([[]] * len(df), index=df.index)
+    signals = signals.map(lambda s: s if isinstance(s, list) else [])
+    signal_count = np.fromiter((sum(1 for x in s if x) for s in signals), dtype=np.int64, count=len(df))
+    signal_mask = np.fromiter((encode_signal_mask(s) for s in signals), dtype=np.uint32, count=len(df))
+    signal_flags = (signal_mask[:, None] >> np.arange(len(DISTRESS_SIGNALS), dtype=np.uint32)) & 1
+    signal_points = np.array([SIGNAL_POINTS.get(name, 0) for name in DISTRESS_SIGNALS])
+    score += signal_flags.astype(np.int64) @ signal_points
+
+    score += np.where(ownership_years >= 15, 5, 0)
+    score += np.where(equity_percent >= 70, 6, 0)
+    score += np.where(equity_percent >= 95, 5, 0)
+    score += ladder_points(signal_count, 'signal_count')
+
+    # URGENCY
+    score += ladder_points(days_on_market, 'days_on_market')
+    score += ladder_points(price_reductions, 'price_reductions')
+    if now.month in [11, 12, 1, 2]:
+        score += 3
+
+    # CONTACT
+    score += np.where(has_text('owner_phone'), 5, 0)
+    score += np.where(has_text('owner_email'), 3, 0)
+    score += np.where(has_text('owner_mailing'), 2, 0)
+
+    score = np.minimum(score, 100)
+    tier = np.select([score >= 75, score >= 55, score >= 35], ['HOT', 'WARM', 'NURTURE'], default='MONITOR')
+
+    return pd.DataFrame({
+        'score': score,
+        'tier': tier,
+        'max_offer': max_offer,
+        'estimated_repairs': estimated_repairs,
+        'gap_percent': gap_percent,
+        'roi': roi,
+        'net_profit': net_profit,
+        'total_investment': total_investment,
+    }, index=df.index)
+
+def predict_arv_bulk(df, city_arrs=CITY_ARRS):
+    """AI-powered ARV prediction for every row of a DataFrame at once"""
+    def col(name, default):
+        return df[name].fillna(default).to_numpy(dtype=float) if name in df else np.full(len(df), default, dtype=float)
+
+    city_idx = df['city'].map(CITY_INDEX) if 'city' in df else pd.Series(np.nan, index=df.index)
+    known = city_idx.notna().to_numpy()
+    city_idx = city_idx.fillna(0).astype(int).to_numpy()
+    median = np.where(known, city_arrs['median_price'][city_idx], DEFAULT_CITY_DATA['median_price'])
+    appr = np.where(known, city_arrs['appreciation'][city_idx], DEFAULT_CITY_DATA['appreciation'])
+
+    sqft = col('sqft', 1500)
+    beds = col('beds', 3)
+    baths = col('baths', 2)
+    age = datetime.now().year - col('year_built', 1970)
+
+    price_per_sqft = median / 1500
     base_arv = sqft * price_per_sqft
-    
-    bed_adjustment = (beds - 3) * 10000
-    bath_adjustment = max(0, (baths - 1.5)) * 7500
-    
-    current_year = datetime.now().year
-    age = current_year - year_built
-    if age <= 10:
-        age_multiplier = 1.15
-    elif age <= 25:
-        age_multiplier = 1.05
-    elif age <= 50:
-        age_multiplier = 1.0
-    else:
-        age_multiplier = 0.92
-    
-    appreciation_factor = 1 + (city_data['appreciation'] / 100)
-    predicted_arv = (base_arv + bed_adjustment + bath_adjustment) * age_multiplier * appreciation_factor
-    
-    confidence = random.randint(75, 95)
-    
+    bed_adj = (beds - 3) * 10000
+    bath_adj = np.maximum(0, baths - 1.5) * 7500
+    age_mult = np.select([age <= 10, age <= 25, age <= 50], [1.15, 1.05, 1.0], default=0.92)
+    predicted = (base_arv + bed_adj + bath_adj) * age_mult * (1 + appr / 100)
+
+    return pd.DataFrame({
+        'predicted_arv': predicted.astype(np.int64),
+        'low_estimate': (predicted * 0.9).astype(np.int64),
+        'high_estimate': (predicted * 1.1).astype(np.int64),
+        'price_per_sqft': (predicted / sqft).astype(np.int64),
+        'appreciation_rate': appr,
+    }, index=df.index)
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def estimate_arv(city, beds, baths, sqft, year_built, current_year):
+    """Deterministic ARV figures for one input tuple; current_year keys the age bucket"""
+    prediction = predict_arv_bulk(pd.DataFrame([{
+        'city': city, 'beds': beds, 'baths': baths, 'sqft': sqft, 'year_built': year_built
+    }])).iloc[0]
     return {
-        'predicted_arv': int(predicted_arv),
-        'low_estimate': int(predicted_arv * 0.9),
-        'high_estimate': int(predicted_arv * 1.1),
-        'confidence': confidence,
-        'price_per_sqft': int(predicted_arv / sqft),
-        'appreciation_rate': city_data['appreciation']
+        'predicted_arv': int(prediction['predicted_arv']),
+        'low_estimate': int(prediction['low_estimate']),
+        'high_estimate': int(prediction['high_estimate']),
+        'price_per_sqft': int(prediction['price_per_sqft']),
+        'appreciation_rate': float(prediction['appreciation_rate'])
     }
 
-def analyze_neighborhood(city):
-    """AI neighborhood analysis"""
-    city_data = MICHIGAN_CITIES.get(city, {'median_price': 150000, 'appreciation': 8.0})
-    
-    school_rating = random.randint(4, 10)
-    crime_score = random.randint(3, 9)
-    walkability = random.randint(20, 85)
-    job_growth = round(random.uniform(1.5, 8.5), 1)
-    population_trend = random.choice(['Growing', 'Stable', 'Declining'])
-    
-    score = int(
-        (school_rating * 2) +
-        (crime_score * 2) +
-        (walkability / 10) +
-        (job_growth * 2) +
-        (city_data['appreciation'] / 2) +
-        (10 if population_trend == 'Growing' else 5 if population_trend == 'Stable' else 0)
+def predict_arv(property_data, city):
+    """AI-powered ARV prediction"""
+    estimate = estimate_arv(
+        city, property_data.get('beds'), property_data.get('baths'), property_data.get('sqft'),
+        property_data.get('year_built'), datetime.now().year
     )
-    score = min(100, score)
-    
-    if score >= 75:
-        grade = 'A'
-        investment_outlook = '🌟 Excellent investment area'
-    elif score >= 60:
-        grade = 'B'
-        investment_outlook = '✅ Good investment potential'
-    elif score >= 45:
-        grade = 'C'
-        investment_outlook = '⚠️ Moderate risk/reward'
-    else:
-        grade = 'D'
-        investment_outlook = '❌ Higher risk area'
+    return {**estimate, 'confidence': random.randint(75, 95)}
+
+NEIGHBORHOOD_OUTLOOKS = {
+    'A': '🌟 Excellent investment area',
+    'B': '✅ Good investment potential',
+    'C': '⚠️ Moderate risk/reward',
+    'D': '❌ Higher risk area',
+}
+
+def analyze_neighborhoods(cities, rng=None):
+    """AI neighborhood analysis for a whole Series of cities at once"""
+    cities = pd.Series(cities).reset_index(drop=True)
+    n = len(cities)
+    rng = rng or np.random.default_rng()
+    
+    idx = cities.map(CITY_INDEX)
+    known = idx.notna().to_numpy()
+    idx = idx.fillna(0).astype(int).to_numpy()
+    appreciation = np.where(known, CITY_ARRS['appreciation'][idx], DEFAULT_CITY_DATA['appreciation'])
+    median_price = np.where(known, CITY_ARRS['median_price'][idx], DEFAULT_CITY_DATA['median_price'])
+    
+    school_rating = rng.integers(4, 11, n)
+    crime_score = rng.integers(3, 10, n)
+    walkability = rng.integers(20, 86, n)
+    job_growth = rng.uniform(1.5, 8.5, n).round(1)
+    population_trend = rng.choice(['Growing', 'Stable', 'Declining'], n)
+    
+    score = (
+        school_rating * 2 +
+        crime_score * 2 +
+        walkability / 10 +
+        job_growth * 2 +
+        appreciation / 2 +
+        np.where(population_trend == 'Growing', 10, np.where(population_trend == 'Stable', 5, 0))
+    )
+    score = np.clip(score.astype(int), 0, 100)
+    grade = pd.cut(score, [-1, 44, 59, 74, 100], labels=['D', 'C', 'B', 'A']).astype(str)
     
-    return {
+    return pd.DataFrame({
         'score': score,
         'grade': grade,
-        'investment_outlook': investment_outlook,
-        'metrics': {
-            'school_rating': school_rating,
-            'crime_score': crime_score,
-            'walkability': walkability,
-            'job_growth': job_growth,
-            'appreciation': city_data['appreciation'],
-            'population_trend': population_trend,
-            'median_price': city_data['median_price']
-        }
+        'investment_outlook': pd.Series(grade).map(NEIGHBORHOOD_OUTLOOKS).to_numpy(),
+        'school_rating': school_rating,
+        'crime_score': crime_score,
+        'walkability': walkability,
+        'job_growth': job_growth,
+        'appreciation': appreciation,
+        'population_trend': population_trend,
+        'median_price': median_price,
+    })
+
+@st.cache_data(ttl=24 * 3600, max_entries=64, show_spinner=False)
+def analyze_neighborhood(city):
+    """AI neighborhood analysis, stable per city"""
+    # crc32 rather than hash(): str hashes are salted per process
+    rng = np.random.default_rng(zlib.crc32(str(city).encode()))
+    row = analyze_neighborhoods([city], rng).iloc[0].to_dict()
+    return {
+        'score': int(row.pop('score')),
+        'grade': row.pop('grade'),
+        'investment_outlook': row.pop('investment_outlook'),
+        'metrics': {k: v.item() if hasattr(v, 'item') else v for k, v in row.items()}
+    }
+
+def analyze_deal(price, arv, repairs, holding_months):
+    """Flip numbers for the Deal Analyzer"""
+    holding_costs = arv * 0.01 * holding_months
+    selling_costs = arv * 0.09
+    total_investment = price + repairs + holding_costs + selling_costs
+    net_profit = arv - total_investment
+    return {
+        'max_offer': (arv * 0.7) - repairs,
+        'total_investment': total_investment,
+        'net_profit': net_profit,
+        'roi': (net_profit / total_investment * 100) if total_investment > 0 else 0,
     }
 
 # ============================================================================
 # DATABASE OPERATIONS
 # ============================================================================
 
-def save_property(property_data, priority_data):
-    """Save property to database"""
-    conn = sqlite3.connect(get_db_path())
-    c = conn.cursor()
-    
-    prop_id = property_data.get('id', f"prop_{datetime.now().strftime('%Y%m%d%H%M%S%f')}")
-    
-    distress_signals = property_data.get('distress_signals', [])
-    if isinstance(distress_signals, list):
-        distress_signals = ','.join(distress_signals)
-    
-    c.execute('''INSERT OR REPLACE INTO properties 
-        (id, address, city, state, zip, beds, baths, sqft, year_built, lot_size,
-         property_type, list_price, estimated_value, arv, mortgage_balance,
-         equity, equity_percent, days_on_market, price_reductions, ownership_years,
-         distress_signals, owner_name, owner_phone, owner_email, owner_mailing,
-         lat, lng, stage, priority_score, priority_tier, neighborhood_score, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
+PROPERTY_COLUMNS = [
+    'id', 'address', 'city', 'state', 'zip', 'beds', 'baths', 'sqft', 'year_built', 'lot_size',
+    'property_type', 'list_price', 'estimated_value', 'arv', 'mortgage_balance',
+    'equity', 'equity_percent', 'days_on_market', 'price_reductions', 'ownership_years',
+    'distress_signals', 'owner_name', 'owner_phone', 'owner_email', 'owner_mailing',
+    'lat', 'lng', 'stage', 'priority_score', 'priority_tier', 'neighborhood_score', 'updated_at'
+]
+
+# Upsert rather than INSERT OR REPLACE: an existing row is updated in place, so
+# created_at survives and no delete+insert churns the indexes
+PROPERTY_INSERT_SQL = (
+    f"INSERT INTO properties ({', '.join(PROPERTY_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(PROPERTY_COLUMNS))}) "
+    f"ON CONFLICT(id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in PROPERTY_COLUMNS[1:])}"
+)
+
+def dump_signals(distress_signals):
+    """Serialize a distress signal list for the distress_signals column"""
+    return json.dumps(list(distress_signals or []))
+
+def parse_signals(value):
+    """Parse the distress_signals column (JSON, or legacy comma-separated text)"""
+    if not isinstance(value, str) or not value:
+        return []
+    if value.startswith('['):
+        return json.loads(value)
+    return value.split(',')
+
+def property_row(property_data, priority_data, updated_at=None):
+    """Flatten a property and its priority into a tuple in PROPERTY_COLUMNS order"""
+    prop_id = property_data.get('id') or f"prop_{secrets.token_hex(8)}"
+
+    distress_signals = dump_signals(property_data.get('distress_signals', []))
+
+    return (
         prop_id,
         property_data.get('address', ''),
         property_data.get('city', ''),
@@ -733,127 +1096,303 @@ def save_property(property_data, priority_data):
         priority_data.get('score', 0),
         priority_data.get('tier', 'MONITOR'),
         property_data.get('neighborhood_score', 50),
-        datetime.now().isoformat()
-    ))
-    
-    conn.commit()
-    conn.close()
-    return prop_id
-
-def get_all_properties():
-    """Get all saved properties"""
-    conn = sqlite3.connect(get_db_path())
-    df = pd.read_sql_query("SELECT * FROM properties ORDER BY priority_score DESC", conn)
-    conn.close()
-    return df
+        updated_at or datetime.now().isoformat()
+    )
+
+# The write path for leads from outside the app (imports, API results). The demo
+# loader writes its scored frame straight through executemany instead
+def save_properties_bulk(records):
+    """Save (property_data, priority_data) pairs in a single transaction"""
+    now = datetime.now().isoformat()
+    rows = [property_row(property_data, priority_data, now) for property_data, priority_data in records]
+    with write_conn() as conn:
+        conn.executemany(PROPERTY_INSERT_SQL, rows)
+    return [row[0] for row in rows]
+
+def save_property(property_data, priority_data):
+    """Save property to database"""
+    return save_properties_bulk([(property_data, priority_data)])[0]
+
+def get_properties_watermark():
+    """Cheap fingerprint of the properties table that changes on every write"""
+    conn = get_conn()
+    count, last_update = conn.execute("SELECT COUNT(*), MAX(updated_at) FROM properties").fetchone()
+    return f"{count}:{last_update}"
+
+SUMMARY_COLUMNS = [
+    'id', 'address', 'city', 'beds', 'baths', 'sqft', 'list_price', 'owner_phone',
+    'lat', 'lng', 'stage', 'priority_score', 'priority_tier'
+]
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def load_properties_filtered(watermark, city=None, tier=None, stage=None, limit=None, after=None):
+    """Summary rows matching city/tier/stage, filtered and limited in SQL"""
+    conn = get_conn()
+    clauses, params = [], []
+    for column, value in (('city', city), ('priority_tier', tier), ('stage', stage)):
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if after:
+        # Keyset paging: resume below the last (score, id) shown instead of OFFSET. Unscored
+        # rows rank as 0, as in the rank indexes, so they are not lost after page 1
+        clauses.append("COALESCE(priority_score, 0) <= ? AND (COALESCE(priority_score, 0) < ? OR id < ?)")
+        params.extend((after[0], after[0], after[1]))
+    query = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM properties"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY COALESCE(priority_score, 0) DESC, id DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return pd.read_sql_query(query, conn, params=params)
+
+def get_properties_filtered(city=None, tier=None, stage=None, limit=None, after=None):
+    """Get summary rows for one city/tier/stage without loading the whole table"""
+    return load_properties_filtered(get_properties_watermark(), city, tier, stage, limit, after)
+
+def get_dashboard_metrics():
+    """Headline counts and sums computed in SQL"""
+    conn = get_conn()
+    count, hot_count, warm_count, pipeline_value, avg_score, closed_count = conn.execute('''
+        SELECT COUNT(*),
+               COUNT(*) FILTER (WHERE priority_tier = 'HOT'),
+               COUNT(*) FILTER (WHERE priority_tier = 'WARM'),
+               COALESCE(SUM(list_price), 0),
+               COALESCE(AVG(priority_score), 0),
+               COUNT(*) FILTER (WHERE stage = 'Closed')
+        FROM properties''').fetchone()
+    return {
+        'count': count,
+        'hot_count': hot_count,
+        'warm_count': warm_count,
+        'pipeline_value': pipeline_value,
+        'avg_score': avg_score,
+        'closed_count': closed_count,
+    }
+
+def get_group_counts(column):
+    """Row counts per value of a properties column, largest first"""
+    conn = get_conn()
+    rows = conn.execute(
+        f"SELECT {column}, COUNT(*) AS n FROM properties GROUP BY {column} ORDER BY n DESC"
+    ).fetchall()
+    return pd.Series([n for _, n in rows], index=[value for value, _ in rows], dtype='int64')
+
+def get_city_stats(order_by='n', limit=10):
+    """Top cities by property count ('n') or average list price ('avg_price')"""
+    if order_by not in ('n', 'avg_price'):
+        raise ValueError(f"Unknown city stat: {order_by}")
+    conn = get_conn()
+    return pd.read_sql_query(
+        f"""SELECT city, COUNT(*) AS n, AVG(list_price) AS avg_price FROM properties
+            GROUP BY city ORDER BY {order_by} DESC LIMIT ?""",
+        conn, params=(limit,)
+    ).set_index('city')
+
+@st.cache_data(ttl=300, max_entries=4, show_spinner=False)
+def load_property_aggregates(watermark):
+    """Analytics aggregates; recomputed only when the watermark moves"""
+    return {
+        **get_dashboard_metrics(),
+        'tier_counts': get_group_counts('priority_tier'),
+        'stage_counts': get_group_counts('stage'),
+        'city_counts': get_city_stats('n')['n'],
+        'city_prices': get_city_stats('avg_price')['avg_price'],
+    }
+
+def get_property_aggregates():
+    """Get the analytics aggregates for the current properties table"""
+    return load_property_aggregates(get_properties_watermark())
+
+def fetch_dicts(query, params=()):
+    """Run a small query and return plain dict rows (no DataFrame overhead)"""
+    c = get_conn().cursor()
+    c.row_factory = sqlite3.Row
+    return [dict(row) for row in c.execute(query, params)]
+
+MICHIGAN_BBOX = (41.6, 48.4, -90.5, -82.0)
+
+def get_properties_in_bbox(min_lat, max_lat, min_lng, max_lng, tier=None, limit=500):
+    """Top-scored properties inside a lat/lng box, filtered in SQL"""
+    conn = get_conn()
+    query = f"""SELECT {', '.join(MAP_COLUMNS)} FROM properties
+                WHERE lat BETWEEN ? AND ? AND lng BETWEEN ? AND ?"""
+    params = [min_lat, max_lat, min_lng, max_lng]
+    if tier:
+        query += " AND priority_tier = ?"
+        params.append(tier)
+    query += " ORDER BY priority_score DESC LIMIT ?"
+    params.append(limit)
+    return pd.read_sql_query(query, conn, params=params)
+
+def get_mapped_properties(tier=None):
+    """Map columns for every geocoded property, filtered in SQL"""
+    conn = get_conn()
+    query = f"""SELECT {', '.join(MAP_COLUMNS)} FROM properties
+                WHERE lat IS NOT NULL AND lng IS NOT NULL AND lat <> 0 AND lng <> 0"""
+    params = []
+    if tier:
+        query += " AND priority_tier = ?"
+        params.append(tier)
+    query += " ORDER BY priority_score DESC"
+    return pd.read_sql_query(query, conn, params=params)
 
 def get_property_by_id(prop_id):
     """Get single property by ID"""
-    conn = sqlite3.connect(get_db_path())
+    conn = get_conn()
     c = conn.cursor()
-    c.execute("SELECT * FROM properties WHERE id = ?", (prop_id,))
-    row = c.fetchone()
-    columns = [description[0] for description in c.description]
-    conn.close()
+    c.row_factory = sqlite3.Row
+    # id is the PRIMARY KEY, so this is a single index probe
+    row = c.execute("SELECT * FROM properties WHERE id = ?", (prop_id,)).fetchone()
     
     if row:
-        return dict(zip(columns, row))
+        prop = dict(row)
+        prop['distress_signals'] = parse_signals(prop.get('distress_signals'))
+        return prop
     return None
 
-def update_property_stage(prop_id, new_stage):
-    """Update property pipeline stage"""
-    conn = sqlite3.connect(get_db_path())
-    c = conn.cursor()
-    c.execute("UPDATE properties SET stage = ?, updated_at = ? WHERE id = ?", 
-              (new_stage, datetime.now().isoformat(), prop_id))
-    conn.commit()
-    conn.close()
+UPDATE_STAGE_SQL = "UPDATE properties SET stage = ?, updated_at = ? WHERE id = ?"
+MARK_ALERT_READ_SQL = "UPDATE alerts SET read = 1 WHERE id = ?"
+NOTE_INSERT_SQL = "INSERT INTO notes (property_id, content, author) VALUES (?, ?, ?)"
+ALL_ALERTS_SQL = "SELECT * FROM alerts ORDER BY created_at DESC"
+UNREAD_ALERTS_SQL = "SELECT * FROM alerts WHERE read = 0 ORDER BY created_at DESC"
+UNREAD_ALERT_COUNT_SQL = "SELECT COUNT(*) FROM alerts WHERE read = 0"
+FOLLOWUP_INSERT_SQL = (
+    "INSERT INTO followups (property_id, type, date, time, assignee, notes) VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+def update_property_stages_bulk(updates):
+    """Move many (prop_id, new_stage) pairs in one transaction"""
+    now = datetime.now().isoformat()
+    with write_conn() as conn:
+        conn.executemany(UPDATE_STAGE_SQL, [(new_stage, now, prop_id) for prop_id, new_stage in updates])
 
+@st.cache_data(ttl=300, show_spinner=False)
 def get_alerts(unread_only=False):
     """Get alerts"""
-    conn = sqlite3.connect(get_db_path())
-    query = "SELECT * FROM alerts"
-    if unread_only:
-        query += " WHERE read = 0"
-    query += " ORDER BY created_at DESC"
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+    conn = get_conn()
+    return pd.read_sql_query(UNREAD_ALERTS_SQL if unread_only else ALL_ALERTS_SQL, conn)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def get_unread_alert_count():
+    """Number of unread alerts, for the navigation badge"""
+    return get_conn().execute(UNREAD_ALERT_COUNT_SQL).fetchone()[0]
 
 def mark_alert_read(alert_id):
     """Mark alert as read"""
-    conn = sqlite3.connect(get_db_path())
-    c = conn.cursor()
-    c.execute("UPDATE alerts SET read = 1 WHERE id = ?", (alert_id,))
-    conn.commit()
-    conn.close()
+    with write_conn() as conn:
+        conn.execute(MARK_ALERT_READ_SQL, (alert_id,))
+    get_alerts.clear()
+    get_unread_alert_count.clear()
 
 def add_note(prop_id, content, author="User"):
     """Add a note"""
-    conn = sqlite3.connect(get_db_path())
-    c = conn.cursor()
-    c.execute('''INSERT INTO notes (property_id, content, author) VALUES (?, ?, ?)''', 
-              (prop_id, content, author))
-    conn.commit()
-    conn.close()
+    with write_conn() as conn:
+        conn.execute(NOTE_INSERT_SQL, (prop_id, content, author))
+    get_notes.clear()
 
+@st.cache_data(ttl=300, show_spinner=False)
 def get_notes(prop_id):
-    """Get notes for property"""
-    conn = sqlite3.connect(get_db_path())
-    df = pd.read_sql_query(
-        "SELECT * FROM notes WHERE property_id = ? ORDER BY created_at DESC", 
-        conn, params=(prop_id,)
-    )
-    conn.close()
-    return df
+    """Get notes for property as a list of dicts"""
+    return fetch_dicts("SELECT * FROM notes WHERE property_id = ? ORDER BY created_at DESC", (prop_id,))
 
 def add_followup(prop_id, followup_type, date, time, assignee, notes=""):
     """Add a follow-up"""
-    conn = sqlite3.connect(get_db_path())
-    c = conn.cursor()
-    c.execute('''INSERT INTO followups (property_id, type, date, time, assignee, notes)
-                 VALUES (?, ?, ?, ?, ?, ?)''', 
-              (prop_id, followup_type, date, time, assignee, notes))
-    conn.commit()
-    conn.close()
+    with write_conn() as conn:
+        conn.execute(FOLLOWUP_INSERT_SQL, (prop_id, followup_type, date, time, assignee, notes))
+    get_followups.clear()
 
+@st.cache_data(ttl=300, show_spinner=False)
 def get_followups(prop_id):
-    """Get follow-ups for property"""
-    conn = sqlite3.connect(get_db_path())
-    df = pd.read_sql_query(
-        "SELECT * FROM followups WHERE property_id = ? ORDER BY date DESC", 
-        conn, params=(prop_id,)
-    )
-    conn.close()
-    return df
+    """Get follow-ups for property as a list of dicts"""
+    return fetch_dicts("SELECT * FROM followups WHERE property_id = ? ORDER BY date DESC", (prop_id,))
+
+def clear_data_caches():
+    """Drop cached alert/note/follow-up reads after a bulk change"""
+    get_alerts.clear()
+    get_unread_alert_count.clear()
+    get_notes.clear()
+    get_followups.clear()
 
 # ============================================================================
 # ANALYTICS
 # ============================================================================
 
-def create_analytics_dashboard(properties_df):
+TIER_CHART_COLORS = {'HOT': '#ef4444', 'WARM': '#f59e0b', 'NURTURE': '#3b82f6', 'MONITOR': '#6b7280'}
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def build_tier_pie(tier_items):
+    """Tier donut chart from (tier, count) pairs"""
+    names, values = map(list, zip(*tier_items))
+    fig = go.Figure(go.Pie(
+        labels=names,
+        values=values,
+        marker_colors=[TIER_CHART_COLORS.get(name, '#6b7280') for name in names],
+        hole=0.4
+    ))
+    fig.update_layout(showlegend=True, height=300)
+    return fig
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def build_stage_bar(stage_items):
+    """Pipeline stage bar chart from (stage, count) pairs"""
+    stages, counts = map(list, zip(*stage_items))
+    fig = go.Figure(go.Bar(
+        x=stages,
+        y=counts,
+        marker=dict(color=counts, colorscale='Viridis', showscale=True)
+    ))
+    fig.update_layout(showlegend=False, height=300, xaxis_title="Stage", yaxis_title="Count")
+    return fig
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_city_bar(city_items, color_scale):
+    """Horizontal per-city bar chart from (city, value) pairs"""
+    cities, values = map(list, zip(*city_items))
+    fig = go.Figure(go.Bar(
+        x=values,
+        y=cities,
+        orientation='h',
+        marker=dict(color=values, colorscale=color_scale, showscale=True)
+    ))
+    fig.update_layout(showlegend=False, height=400)
+    return fig
+
+ANALYTICS_CHART_MIN_ROWS = 10
+
+def render_simple_metrics(agg):
+    """Plain-text breakdowns for portfolios too small to chart"""
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("📊 By Tier")
+        for tier, count in agg['tier_counts'].items():
+            st.write(f"**{tier}:** {count}")
+    with col2:
+        st.subheader("📋 By Stage")
+        for stage, count in agg['stage_counts'].items():
+            st.write(f"**{stage}:** {count}")
+
+def create_analytics_dashboard():
     """Create analytics dashboard"""
-    if properties_df.empty:
+    agg = get_property_aggregates()
+    if agg['count'] == 0:
         st.warning("No data available for analytics.")
         return
     
     col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
-        hot_count = len(properties_df[properties_df['priority_tier'] == 'HOT'])
-        st.metric("🔥 Hot Leads", hot_count)
+        st.metric("🔥 Hot Leads", agg['hot_count'])
     
     with col2:
-        total_value = properties_df['list_price'].sum()
-        st.metric("💰 Pipeline Value", f"${total_value/1000000:.1f}M")
+        st.metric("💰 Pipeline Value", f"${agg['pipeline_value']/1000000:.1f}M")
     
     with col3:
-        avg_score = properties_df['priority_score'].mean()
-        st.metric("📊 Avg Score", f"{avg_score:.0f}")
+        st.metric("📊 Avg Score", f"{agg['avg_score']:.0f}")
     
     with col4:
-        closed_count = len(properties_df[properties_df['stage'] == 'Closed'])
-        st.metric("✅ Closed Deals", closed_count)
+        st.metric("✅ Closed Deals", agg['closed_count'])
     
     with col5:
         avg_roi = 22.5
@@ -861,31 +1400,21 @@ def create_analytics_dashboard(properties_df):
     
     st.markdown("---")
     
+    # Charts of a handful of rows say nothing a list doesn't; skip the Plotly payloads
+    if agg['count'] < ANALYTICS_CHART_MIN_ROWS:
+        render_simple_metrics(agg)
+        return
+    
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("📊 Properties by Priority Tier")
-        tier_counts = properties_df['priority_tier'].value_counts()
-        fig = px.pie(
-            values=tier_counts.values, 
-            names=tier_counts.index,
-            color=tier_counts.index,
-            color_discrete_map={'HOT': '#ef4444', 'WARM': '#f59e0b', 'NURTURE': '#3b82f6', 'MONITOR': '#6b7280'},
-            hole=0.4
-        )
-        fig.update_layout(showlegend=True, height=300)
+        fig = build_tier_pie(tuple(agg['tier_counts'].items()))
         st.plotly_chart(fig, use_container_width=True)
     
     with col2:
         st.subheader("📋 Pipeline Distribution")
-        stage_counts = properties_df['stage'].value_counts()
-        fig = px.bar(
-            x=stage_counts.index, 
-            y=stage_counts.values,
-            color=stage_counts.values,
-            color_continuous_scale='Viridis'
-        )
-        fig.update_layout(showlegend=False, height=300, xaxis_title="Stage", yaxis_title="Count")
+        fig = build_stage_bar(tuple(agg['stage_counts'].items()))
         st.plotly_chart(fig, use_container_width=True)
     
     st.markdown("---")
@@ -894,111 +1423,158 @@ def create_analytics_dashboard(properties_df):
     
     with col1:
         st.subheader("🏙️ Properties by City")
-        city_counts = properties_df['city'].value_counts().head(10)
-        fig = px.bar(
-            x=city_counts.values, 
-            y=city_counts.index,
-            orientation='h',
-            color=city_counts.values,
-            color_continuous_scale='Blues'
-        )
-        fig.update_layout(showlegend=False, height=400)
+        fig = build_city_bar(tuple(agg['city_counts'].items()), 'Blues')
         st.plotly_chart(fig, use_container_width=True)
     
     with col2:
         st.subheader("💵 Avg Price by City")
-        city_prices = properties_df.groupby('city')['list_price'].mean().sort_values(ascending=False).head(10)
-        fig = px.bar(
-            x=city_prices.values, 
-            y=city_prices.index,
-            orientation='h',
-            color=city_prices.values,
-            color_continuous_scale='Greens'
-        )
-        fig.update_layout(showlegend=False, height=400)
+        fig = build_city_bar(tuple(agg['city_prices'].items()), 'Greens')
         st.plotly_chart(fig, use_container_width=True)
 
 # ============================================================================
 # MAP
 # ============================================================================
 
-def create_property_map(properties_df, selected_property=None):
-    """Create interactive map"""
-    center_lat = 42.7325
-    center_lng = -84.5555
-    
-    if selected_property:
-        center_lat = selected_property.get('lat', center_lat) or center_lat
-        center_lng = selected_property.get('lng', center_lng) or center_lng
-        zoom = 14
-    else:
-        zoom = 7
-    
-    m = folium.Map(location=[center_lat, center_lng], zoom_start=zoom, tiles='cartodbpositron')
-    
-    tier_colors = {
-        'HOT': 'red',
-        'WARM': 'orange',
-        'NURTURE': 'blue',
-        'MONITOR': 'gray'
-    }
-    
-    if not properties_df.empty:
-        for _, prop in properties_df.iterrows():
-            lat = prop.get('lat', 0)
-            lng = prop.get('lng', 0)
-            
-            if lat and lng and lat != 0 and lng != 0:
-                tier = prop.get('priority_tier', 'MONITOR')
-                color = tier_colors.get(tier, 'gray')
-                
-                popup_html = f"""
-                <div style="width: 200px;">
-                    <h4>{prop.get('address', 'N/A')}</h4>
-                    <p>{prop.get('city', '')}, MI</p>
-                    <p>💰 ${prop.get('list_price', 0):,}</p>
-                    <p>🎯 Score: {prop.get('priority_score', 0)}</p>
-                </div>
-                """
-                
-                folium.CircleMarker(
-                    location=[lat, lng],
-                    radius=12 if tier == 'HOT' else 8,
-                    color=color,
-                    fill=True,
-                    fillColor=color,
-                    fillOpacity=0.7,
-                    popup=folium.Popup(popup_html, max_width=250)
-                ).add_to(m)
-    
-    return m
+TIER_MAP_COLORS = {
+    'HOT': 'red',
+    'WARM': 'orange',
+    'NURTURE': 'blue',
+    'MONITOR': 'gray'
+}
+
+def create_base_map():
+    """Tile layer only; markers are added separately"""
+    return folium.Map(location=[42.7325, -84.5555], zoom_start=7, tiles='cartodbpositron')
+
+def build_marker_columns(properties_df):
+    """Location, colour, radius and popup HTML for every mappable property, as plain lists"""
+    lat = properties_df['lat'].fillna(0)
+    lng = properties_df['lng'].fillna(0)
+    sub = properties_df.loc[(lat != 0) & (lng != 0)]
+    tiers = sub['priority_tier'].astype(object).fillna('MONITOR')
+    colors = tiers.map(TIER_MAP_COLORS).fillna('gray')
+    # Popup HTML for every marker in one column-wise concat instead of an f-string per row
+    popups = (
+        '<div style="width: 200px;"><h4>' + sub['address'].fillna('N/A').astype(str)
+        + '</h4><p>' + sub['city'].astype(object).fillna('').astype(str)
+        + ', MI</p><p>💰 $' + sub['list_price'].fillna(0).map('{:,}'.format)
+        + '</p><p>🎯 Score: ' + sub['priority_score'].fillna(0).astype(str)
+        + '</p></div>'
+    )
+    return (
+        sub['lat'].tolist(),
+        sub['lng'].tolist(),
+        colors.tolist(),
+        np.where(tiers == 'HOT', 12, 8).tolist(),
+        popups.tolist(),
+    )
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_marker_columns(df_hash, _properties_df):
+    """Marker columns cached by content hash; plain lists pickle cheaply, folium objects do not"""
+    return build_marker_columns(_properties_df)
+
+def marker_group(properties_df):
+    """All property markers in one FeatureGroup, built from the cached marker columns"""
+    markers = folium.FeatureGroup(name='Properties')
+    if properties_df.empty:
+        return markers
+    
+    map_df = properties_df[MAP_COLUMNS]
+    df_hash = str(pd.util.hash_pandas_object(map_df, index=False).sum())
+    for lat, lng, color, radius, popup_html in zip(*load_marker_columns(df_hash, map_df)):
+        folium.CircleMarker(
+            location=[lat, lng],
+            radius=radius,
+            color=color,
+            fill=True,
+            fillColor=color,
+            fillOpacity=0.7,
+            popup=folium.Popup(popup_html, max_width=250)
+        ).add_to(markers)
+    return markers
+
+MAP_COLUMNS = ['lat', 'lng', 'priority_tier', 'priority_score', 'address', 'city', 'list_price']
+MAP_WEBGL_THRESHOLD = 500
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def build_property_map_figure(df_hash, _map_df):
+    """WebGL Plotly map for large property sets, cached by content hash"""
+    fig = px.scatter_map(
+        _map_df,
+        lat='lat',
+        lon='lng',
+        color='priority_tier',
+        color_discrete_map=TIER_MAP_COLORS,
+        size='priority_score',
+        size_max=12,
+        hover_name='address',
+        hover_data={'city': True, 'list_price': ':$,', 'priority_score': True, 'lat': False, 'lng': False},
+        map_style='carto-positron',
+        center={'lat': 42.7325, 'lon': -84.5555},
+        zoom=6,
+        height=500
+    )
+    fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), legend_title_text='Tier')
+    return fig
+
+def property_map_figure(properties_df):
+    """Hash the map columns and return the cached Plotly figure"""
+    map_df = properties_df[MAP_COLUMNS]
+    df_hash = str(pd.util.hash_pandas_object(map_df, index=False).sum())
+    return build_property_map_figure(df_hash, map_df)
 
 # ============================================================================
 # PDF REPORT
 # ============================================================================
 
-def generate_cma_pdf(property_data, priority_data):
-    """Generate CMA PDF report"""
+# Report styles are immutable, so build them once at import
+PDF_STYLES = getSampleStyleSheet()
+
+PDF_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=PDF_STYLES['Title'],
+    fontSize=24,
+    textColor=colors.HexColor('#6366f1'),
+    spaceAfter=12
+)
+
+PDF_HEADING_STYLE = ParagraphStyle(
+    'CustomHeading',
+    parent=PDF_STYLES['Heading2'],
+    fontSize=14,
+    textColor=colors.HexColor('#6366f1'),
+    spaceBefore=12,
+    spaceAfter=6
+)
+
+PDF_FOOTER_STYLE = ParagraphStyle('Footer', parent=PDF_STYLES['Normal'], fontSize=8, textColor=colors.grey)
+
+PDF_FIN_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#e8f5e9')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+])
+
+PDF_FIN_ROWS = [
+    ('List Price', "${list_price:,}"),
+    ('Estimated ARV', "${arv:,}"),
+    ('Max Offer (70% Rule)', "${max_offer:,.0f}"),
+    ('Estimated Repairs', "${estimated_repairs:,.0f}"),
+    ('Estimated ROI', "{roi:.1f}%"),
+]
+
+PDF_FIN_COL_WIDTHS = [3*inch, 2*inch]
+
+def build_cma_pdf(property_data, priority_data):
+    """Render the CMA PDF report to bytes"""
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    styles = getSampleStyleSheet()
-    
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Title'],
-        fontSize=24,
-        textColor=colors.HexColor('#6366f1'),
-        spaceAfter=12
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#6366f1'),
-        spaceBefore=12,
-        spaceAfter=6
-    )
+    styles = PDF_STYLES
+    title_style = PDF_TITLE_STYLE
+    heading_style = PDF_HEADING_STYLE
     
     story = []
     
@@ -1019,30 +1595,478 @@ def generate_cma_pdf(property_data, priority_data):
     
     story.append(Paragraph("Investment Analysis", heading_style))
     financials = priority_data.get('financials', {})
-    fin_data = [
-        ['List Price', f"${property_data.get('list_price', 0):,}"],
-        ['Estimated ARV', f"${property_data.get('arv', 0):,}"],
-        ['Max Offer (70% Rule)', f"${financials.get('max_offer', 0):,.0f}"],
-        ['Estimated Repairs', f"${financials.get('estimated_repairs', 0):,.0f}"],
-        ['Estimated ROI', f"{financials.get('roi', 0):.1f}%"],
-    ]
-    fin_table = Table(fin_data, colWidths=[3*inch, 2*inch])
-    fin_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#e8f5e9')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    story.append(fin_table)
+    values = {
+        'list_price': property_data.get('list_price', 0),
+        'arv': property_data.get('arv', 0),
+        'max_offer': financials.get('max_offer', 0),
+        'estimated_repairs': financials.get('estimated_repairs', 0),
+        'roi': financials.get('roi', 0),
+    }
+    fin_data = [[label, fmt.format_map(values)] for label, fmt in PDF_FIN_ROWS]
+    story.append(Table(fin_data, colWidths=PDF_FIN_COL_WIDTHS, style=PDF_FIN_TABLE_STYLE))
     
     story.append(Spacer(1, 30))
-    story.append(Paragraph("Generated by FlipFinder Pro", 
-                          ParagraphStyle('Footer', parent=styles['Normal'], fontSize=8, textColor=colors.grey)))
+    story.append(Paragraph("Generated by FlipFinder Pro", PDF_FOOTER_STYLE))
     
     doc.build(story)
-    buffer.seek(0)
-    return buffer
+    return buffer.getvalue()
+
+PDF_JOB_LIMIT = 32
+
+@st.cache_resource
+def get_pdf_pool():
+    """Background workers for CMA report rendering"""
+    return ThreadPoolExecutor(max_workers=2)
+
+@st.cache_resource
+def get_pdf_jobs():
+    """Recent report futures, keyed by property/score/update, plus their lock"""
+    return OrderedDict(), threading.Lock()
+
+def generate_cma_pdf(property_data, priority_data):
+    """Start (or reuse) a background CMA report build; returns a Future of the PDF bytes"""
+    key = (
+        property_data.get('id'), property_data.get('updated_at'),
+        priority_data.get('score'), datetime.now().date()
+    )
+    jobs, lock = get_pdf_jobs()
+    with lock:
+        future = jobs.get(key)
+        if future is None or (future.done() and future.exception()):
+            future = jobs[key] = get_pdf_pool().submit(build_cma_pdf, property_data, priority_data)
+            while len(jobs) > PDF_JOB_LIMIT:
+                jobs.popitem(last=False)
+        else:
+            jobs.move_to_end(key)
+    return future
+
+# ============================================================================
+# PAGES
+# ============================================================================
+
+def render_dashboard():
+    """Headline metrics and today's hot leads"""
+    st.header("Dashboard")
+    
+    metrics = get_dashboard_metrics()
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    
+    with col1:
+        st.metric("🔥 Hot Leads", metrics['hot_count'])
+    
+    with col2:
+        st.metric("🌡️ Warm Leads", metrics['warm_count'])
+    
+    with col3:
+        st.metric("🏠 Total Properties", metrics['count'])
+    
+    with col4:
+        st.metric("💰 Pipeline Value", f"${metrics['pipeline_value']/1000000:.1f}M")
+    
+    with col5:
+        st.metric("📈 Avg Score", f"{metrics['avg_score']:.0f}")
+    
+    st.markdown("---")
+    st.subheader("🔥 Hot Leads - Contact Today")
+    
+    if metrics['count']:
+        hot_leads = get_properties_filtered(tier='HOT', limit=6)
+        
+        if not hot_leads.empty:
+            cols = st.columns(3)
+            for idx, prop in enumerate(hot_leads.itertuples(index=False)):
+                with cols[idx % 3]:
+                    with st.container(border=True):
+                        st.markdown(f"**{prop.address}**")
+                        st.caption(f"{prop.city}, MI")
+                        st.markdown(f"💰 ${prop.list_price:,} | 🎯 Score: **{prop.priority_score}**")
+                        
+                        if st.button("View Details", key=f"hot_{prop.id}"):
+                            st.session_state.selected_property = prop.id
+                            st.rerun()
+        else:
+            st.info("No hot leads yet.")
+
+def render_property_search():
+    """API search and the saved property list"""
+    st.header("Property Search")
+    
+    if not st.session_state.use_mock_data:
+        st.info("🔑 **API Mode Active** - Search real properties")
+        
+        if not st.session_state.api_key:
+            st.warning("⚠️ Enter your API key in the sidebar")
+        else:
+            api_city = st.selectbox("City", list(MICHIGAN_CITIES.keys()), key="api_city")
+            
+            if st.button("🔍 Search RealEstateAPI", type="primary"):
+                with st.spinner("Searching..."):
+                    api = get_api(st.session_state.api_key)
+                    
+                    # Minimal params
+                    params = {
+                        "city": api_city,
+                        "state": "MI",
+                        "size": 25
+                    }
+                    
+                    with st.expander("🔧 Debug: Request"):
+                        st.json(params)
+                    
+                    results = api.property_search(params)
+                    
+                    with st.expander("🔧 Debug: Response"):
+                        st.json(results)
+                    
+                    data = extract_api_rows(results)
+                    
+                    if data and len(data) > 0:
+                        st.success(f"✅ Found {len(data)} properties!")
+                        st.session_state.api_results = data
+                    elif results and results.get('error'):
+                        st.error(f"API Error: {results.get('error')}")
+                    else:
+                        st.warning("No properties found.")
+            
+            st.markdown("---")
+    
+    st.subheader("📋 Saved Properties")
+    
+    city_counts = get_group_counts('city')
+    
+    if not city_counts.empty:
+        city_filter = st.selectbox("Filter by City", ["All Cities"] + list(city_counts.index))
+        
+        city = None if city_filter == "All Cities" else city_filter
+        total = city_counts[city] if city else city_counts.sum()
+        # Cursor stack per filter: the (score, id) each visited page starts after
+        cursors = st.session_state.setdefault('search_cursors', {}).setdefault(city_filter, [None])
+        page_df = get_properties_filtered(city=city, limit=SEARCH_PAGE_SIZE, after=cursors[-1])
+        if page_df.empty and len(cursors) > 1:
+            # The data moved under a stale cursor; start over from the top
+            del cursors[1:]
+            page_df = get_properties_filtered(city=city, limit=SEARCH_PAGE_SIZE)
+        shown = (len(cursors) - 1) * SEARCH_PAGE_SIZE + len(page_df)
+        st.markdown(f"**{total} properties**")
+        
+        page_df = page_df.assign(tier_emoji=page_df['priority_tier'].astype(object).map(TIER_EMOJI).fillna(''))
+        for prop in page_df.itertuples(index=False):
+            with st.container(border=True):
+                col1, col2, col3 = st.columns([2, 1, 1])
+                
+                with col1:
+                    st.markdown(f"**{prop.address}**")
+                    st.caption(f"{prop.city}, MI | {prop.beds}bd/{prop.baths}ba | {prop.sqft:,} sqft")
+                
+                with col2:
+                    st.metric("Price", f"${prop.list_price:,}")
+                
+                with col3:
+                    st.markdown(f"{prop.tier_emoji} {prop.priority_score}")
+                    if st.button("View", key=f"view_{prop.id}"):
+                        st.session_state.selected_property = prop.id
+                        st.rerun()
+        
+        if total > SEARCH_PAGE_SIZE:
+            col_prev, col_info, col_next = st.columns([1, 2, 1])
+            with col_prev:
+                if len(cursors) > 1 and st.button("◀ Previous"):
+                    cursors.pop()
+                    st.rerun()
+            with col_info:
+                st.caption(f"Showing {shown - len(page_df) + 1}–{shown} of {total}")
+            with col_next:
+                if shown < total and not page_df.empty and st.button("Next ▶"):
+                    last = page_df.iloc[-1]
+                    score = 0 if pd.isna(last['priority_score']) else last['priority_score'].item()
+                    cursors.append((score, last['id']))
+                    st.rerun()
+
+def render_tier_list(tier, total, limit=10):
+    """Top leads of one tier as a single markdown bullet list"""
+    tier_df = get_properties_filtered(tier=tier, limit=limit)
+    st.markdown(f"**{total} {tier.lower()} leads**")
+    lines = "• " + tier_df['address'].astype(str) + " - " + tier_df['city'].astype(str) + " - Score: " + tier_df['priority_score'].astype(str)
+    st.markdown("  \n".join(lines))
+
+def render_priority_queue():
+    """Leads grouped by priority tier"""
+    st.header("Contact Priority Queue")
+    
+    tier_counts = get_group_counts('priority_tier')
+    
+    if not tier_counts.empty:
+        tab1, tab2, tab3, tab4 = st.tabs(["🔥 HOT", "🌡️ WARM", "💧 NURTURE", "👀 MONITOR"])
+        
+        with tab1:
+            hot_total = tier_counts.get('HOT', 0)
+            hot_df = get_properties_filtered(tier='HOT', limit=HOT_QUEUE_LIMIT)
+            st.markdown(f"**{hot_total} hot leads** - Call TODAY!")
+            for prop in hot_df.itertuples(index=False):
+                with st.container(border=True):
+                    col1, col2 = st.columns([3, 1])
+                    with col1:
+                        st.markdown(f"**{prop.address}** - {prop.city}")
+                        st.caption(f"💰 ${prop.list_price:,} | Score: {prop.priority_score}")
+                        if prop.owner_phone:
+                            st.markdown(f"📞 {prop.owner_phone}")
+                    with col2:
+                        if st.button("View", key=f"q_{prop.id}"):
+                            st.session_state.selected_property = prop.id
+                            st.rerun()
+            if hot_total > HOT_QUEUE_LIMIT:
+                st.caption(f"…and {hot_total - HOT_QUEUE_LIMIT} more")
+        
+        for tab, tier in zip((tab2, tab3, tab4), ('WARM', 'NURTURE', 'MONITOR')):
+            with tab:
+                render_tier_list(tier, tier_counts.get(tier, 0))
+
+@st.fragment
+def render_pipeline():
+    """Stage counts and stage moves"""
+    st.header("Deal Pipeline")
+    
+    stage_counts = get_group_counts('stage')
+    
+    if not stage_counts.empty:
+        st.subheader("Pipeline Overview")
+        
+        counts = stage_counts.reindex(PIPELINE_STAGES, fill_value=0).to_numpy()
+        for col, stage, count in zip(st.columns(len(PIPELINE_STAGES)), PIPELINE_STAGES, counts):
+            with col:
+                st.metric(stage, int(count))
+        
+        st.markdown("---")
+        
+        selected_stage = st.selectbox("Filter by Stage", ["All"] + PIPELINE_STAGES)
+        
+        filtered = get_properties_filtered(stage=None if selected_stage == "All" else selected_stage, limit=15)
+        # Stage moves are staged here and written together by the Apply button. They only
+        # cover the rows on screen, so switching the filter starts a fresh batch
+        if st.session_state.get('pending_stage_filter') != selected_stage:
+            st.session_state.pending_stage_filter = selected_stage
+            st.session_state.pending_stage_changes = {}
+        pending = st.session_state.pending_stage_changes
+        
+        for prop in filtered.itertuples(index=False):
+            with st.container(border=True):
+                col1, col2 = st.columns([2, 1])
+                with col1:
+                    st.markdown(f"**{prop.address}** - {prop.city}")
+                    st.caption(f"${prop.list_price:,} | Current: {prop.stage}")
+                with col2:
+                    new_stage = st.selectbox(
+                        "Move to",
+                        PIPELINE_STAGES,
+                        index=PIPELINE_STAGE_INDEX.get(prop.stage, 0),
+                        key=f"pipe_{prop.id}"
+                    )
+                    if new_stage != prop.stage:
+                        pending[prop.id] = new_stage
+                    else:
+                        pending.pop(prop.id, None)
+        
+        if pending and st.button(f"💾 Apply {len(pending)} stage change{'s' if len(pending) > 1 else ''}", type="primary"):
+            update_property_stages_bulk(pending.items())
+            st.session_state.pending_stage_changes = {}
+            st.rerun()
+
+@st.fragment
+def render_map_view():
+    """Property map"""
+    st.header("Property Map")
+    
+    if get_dashboard_metrics()['count']:
+        map_tier = st.selectbox("Filter by Tier", ["All", "HOT", "WARM", "NURTURE", "MONITOR"])
+        
+        tier_counts = get_group_counts('priority_tier')
+        shown = tier_counts.sum() if map_tier == "All" else tier_counts.get(map_tier, 0)
+        
+        st.markdown(f"Showing **{shown}** properties")
+        
+        # Leaflet markers stall past a few hundred points; switch to WebGL for big sets
+        if shown > MAP_WEBGL_THRESHOLD:
+            mapped = get_mapped_properties(tier=None if map_tier == "All" else map_tier)
+            st.plotly_chart(property_map_figure(mapped), use_container_width=True)
+        else:
+            # Query only what is inside the last reported viewport; markers are
+            # swapped in as a feature group so panning doesn't remount the map
+            bbox = MICHIGAN_BBOX
+            map_state = st.session_state.get('property_map') or {}
+            bounds = map_state.get('bounds') or {}
+            if bounds.get('_southWest') and bounds.get('_northEast'):
+                sw, ne = bounds['_southWest'], bounds['_northEast']
+                bbox = (sw['lat'], ne['lat'], sw['lng'], ne['lng'])
+            visible = get_properties_in_bbox(
+                *bbox, tier=None if map_tier == "All" else map_tier, limit=MAP_WEBGL_THRESHOLD
+            )
+            st_folium(
+                create_base_map(),
+                key='property_map',
+                feature_group_to_add=marker_group(visible),
+                returned_objects=['bounds'],
+                width=None,
+                height=500,
+                use_container_width=True
+            )
+        
+        st.markdown("**Legend:** 🔴 HOT | 🟠 WARM | 🔵 NURTURE | ⚪ MONITOR")
+
+def render_analytics():
+    """Analytics charts"""
+    st.header("Analytics Dashboard")
+    create_analytics_dashboard()
+
+def render_alerts():
+    """Alert inbox"""
+    st.header("🔔 Alerts")
+    
+    alerts_df = get_alerts()
+    
+    if not alerts_df.empty:
+        for alert in alerts_df.itertuples(index=False):
+            is_read = alert.read == 1
+            
+            with st.container(border=True):
+                col1, col2 = st.columns([4, 1])
+                with col1:
+                    st.markdown(f"{ALERT_PRIORITY_EMOJI.get(alert.priority, '⚪')} **{alert.title}**")
+                    st.caption(alert.message)
+                with col2:
+                    if not is_read:
+                        if st.button("✓", key=f"alert_{alert.id}"):
+                            mark_alert_read(alert.id)
+                            st.rerun()
+    else:
+        st.info("No alerts")
+
+@st.fragment
+def render_ai_tools():
+    """ARV, neighborhood and deal tools"""
+    st.header("🤖 AI-Powered Tools")
+    
+    tab1, tab2, tab3 = st.tabs(["🏷️ ARV Predictor", "🏘️ Neighborhood Analysis", "📊 Deal Analyzer"])
+    
+    with tab1:
+        st.subheader("AI ARV Prediction")
+        
+        # Inputs only rerun the page on submit, not on every edit
+        with st.form("arv_form", border=False):
+            col1, col2 = st.columns(2)
+            with col1:
+                arv_city = st.selectbox("City", list(MICHIGAN_CITIES.keys()))
+                arv_beds = st.number_input("Bedrooms", min_value=1, max_value=6, value=3)
+                arv_baths = st.number_input("Bathrooms", min_value=1.0, max_value=5.0, value=2.0, step=0.5)
+            with col2:
+                arv_sqft = st.number_input("Square Feet", min_value=500, max_value=5000, value=1500)
+                arv_year = st.number_input("Year Built", min_value=1900, max_value=2024, value=1980)
+            predict = st.form_submit_button("🔮 Predict ARV", type="primary")
+        
+        if predict:
+            prop_data = {'beds': arv_beds, 'baths': arv_baths, 'sqft': arv_sqft, 'year_built': arv_year}
+            prediction = predict_arv(prop_data, arv_city)
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Predicted ARV", f"${prediction['predicted_arv']:,}")
+            with col2:
+                st.metric("Confidence", f"{prediction['confidence']}%")
+            with col3:
+                st.metric("Price/Sqft", f"${prediction['price_per_sqft']}")
+    
+    with tab2:
+        st.subheader("🏘️ Neighborhood Analysis")
+        
+        with st.form("neighborhood_form", border=False):
+            analysis_city = st.selectbox("Select City", list(MICHIGAN_CITIES.keys()), key="analysis_city")
+            analyze = st.form_submit_button("🔍 Analyze", type="primary")
+        
+        if analyze:
+            analysis = analyze_neighborhood(analysis_city)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Score", f"{analysis['score']}/100")
+                st.metric("Grade", analysis['grade'])
+            with col2:
+                st.info(analysis['investment_outlook'])
+    
+    with tab3:
+        st.subheader("📊 Deal Analyzer")
+        
+        with st.form("deal_form", border=False):
+            col1, col2 = st.columns(2)
+            with col1:
+                deal_price = st.number_input("Purchase Price", min_value=0, value=100000, step=5000)
+                deal_arv = st.number_input("Estimated ARV", min_value=0, value=150000, step=5000)
+            with col2:
+                deal_repairs = st.number_input("Estimated Repairs", min_value=0, value=30000, step=5000)
+                deal_holding = st.number_input("Holding Months", min_value=1, max_value=12, value=4)
+            run_deal = st.form_submit_button("📊 Analyze Deal", type="primary")
+        
+        if run_deal:
+            deal = analyze_deal(deal_price, deal_arv, deal_repairs, deal_holding)
+            roi = deal['roi']
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Max Offer", f"${deal['max_offer']:,.0f}")
+            with col2:
+                st.metric("Total Investment", f"${deal['total_investment']:,.0f}")
+            with col3:
+                st.metric("Net Profit", f"${deal['net_profit']:,.0f}")
+            with col4:
+                st.metric("ROI", f"{roi:.1f}%")
+            
+            if roi >= 20 and deal['net_profit'] >= 20000:
+                st.success("✅ GOOD DEAL!")
+            elif roi >= 15:
+                st.info("👍 DECENT DEAL")
+            elif roi >= 10:
+                st.warning("⚠️ MARGINAL")
+            else:
+                st.error("❌ PASS")
+
+def render_settings():
+    """Demo data and database maintenance"""
+    st.header("Settings")
+    
+    st.subheader("📊 Database")
+    st.info(f"Total properties: {get_dashboard_metrics()['count']}")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔄 Regenerate Demo Data"):
+            with write_conn() as conn:
+                conn.execute("DELETE FROM properties")
+                conn.execute("DELETE FROM alerts")
+            clear_data_caches()
+            st.session_state.mock_loaded = False
+            st.rerun()
+    
+    with col2:
+        if st.button("🗑️ Clear All Data"):
+            with write_conn() as conn:
+                conn.execute("DELETE FROM properties")
+                conn.execute("DELETE FROM followups")
+                conn.execute("DELETE FROM notes")
+                conn.execute("DELETE FROM alerts")
+            clear_data_caches()
+            st.success("Data cleared!")
+            st.rerun()
+
+PAGES = {
+    "🏠 Dashboard": render_dashboard,
+    "🔍 Property Search": render_property_search,
+    "🎯 Priority Queue": render_priority_queue,
+    "📋 Pipeline": render_pipeline,
+    "🗺️ Map View": render_map_view,
+    "📊 Analytics": render_analytics,
+    "🔔 Alerts": render_alerts,
+    "🤖 AI Tools": render_ai_tools,
+    "⚙️ Settings": render_settings,
+}
 
 # ============================================================================
 # MAIN APPLICATION
@@ -1081,8 +2105,7 @@ def main():
         
         st.markdown("---")
         
-        alerts_df = get_alerts(unread_only=True)
-        alert_count = len(alerts_df)
+        alert_count = get_unread_alert_count()
         
         page = st.radio("Navigation", [
             "🏠 Dashboard",
@@ -1141,14 +2164,15 @@ def main():
             
             st.markdown("---")
             
-            priority = calculate_ai_priority_score(prop_data)
-            tier_colors = {'HOT': '🔴', 'WARM': '🟠', 'NURTURE': '🔵', 'MONITOR': '⚪'}
+            priority = get_priority_score(prop_data)
+            # Render the CMA report in the background while the rest of the page draws
+            cma_pdf = generate_cma_pdf(prop_data, priority)
             
             col1, col2, col3 = st.columns(3)
             with col1:
                 st.metric("Priority Score", f"{priority['score']}/100")
             with col2:
-                st.metric("Tier", f"{tier_colors.get(priority['tier'], '')} {priority['tier']}")
+                st.metric("Tier", f"{TIER_EMOJI.get(priority['tier'], '')} {priority['tier']}")
             with col3:
                 st.metric("Stage", prop_data.get('stage', 'New Lead'))
             
@@ -1195,7 +2219,7 @@ def main():
                     st.markdown("---")
                     if st.button("🔍 Skip Trace (Get Contact Info)", type="primary"):
                         with st.spinner("Running skip trace..."):
-                            api = RealEstateAPI(st.session_state.api_key)
+                            api = get_api(st.session_state.api_key)
                             result = api.skip_trace(prop_data.get('id', ''))
                             if result and not result.get('error'):
                                 st.success("✅ Skip trace complete!")
@@ -1211,12 +2235,10 @@ def main():
                         st.success("✅ Note added!")
                         st.rerun()
                 
-                notes = get_notes(st.session_state.selected_property)
-                if not notes.empty:
-                    for _, note in notes.iterrows():
-                        st.caption(f"{note['created_at']}")
-                        st.write(note['content'])
-                        st.markdown("---")
+                for note in get_notes(st.session_state.selected_property):
+                    st.caption(f"{note['created_at']}")
+                    st.write(note['content'])
+                    st.markdown("---")
             
             with tab5:
                 st.markdown("### 🌐 External Resources")
@@ -1251,18 +2273,6 @@ def main():
                 st.markdown("---")
                 st.markdown("**📋 Public Records (Michigan):**")
                 
-                # Michigan County Assessor links
-                county_links = {
-                    'Detroit': 'https://detroitmi.gov/departments/office-chief-financial-officer/ocfo-divisions/office-assessor',
-                    'Wayne County': 'https://www.waynecounty.com/elected/register/property-search.aspx',
-                    'Oakland County': 'https://www.oakgov.com/re/Pages/default.aspx',
-                    'Macomb County': 'https://www.macombcountymi.gov/equalization/',
-                    'Kent County': 'https://www.accesskent.com/PropertyRecordSearch/',
-                    'Genesee County': 'https://www.gc4me.com/departments/equalization/property_search.php',
-                    'Washtenaw County': 'https://www.washtenaw.org/297/Equalization',
-                    'Ingham County': 'https://www.ingham.org/equalization/',
-                }
-                
                 col1, col2 = st.columns(2)
                 with col1:
                     st.link_button("🔍 BS&A Online (MI Property Search)", "https://bsaonline.com/", use_container_width=True)
@@ -1281,399 +2291,25 @@ def main():
                     st.link_button("🏠 Realtor.com Value", f"https://www.realtor.com/realestateandhomes-search/{encoded_address}", use_container_width=True)
                     st.link_button("📉 ATTOM Data", "https://www.attomdata.com/", use_container_width=True)
             
-            if st.button("📄 Generate CMA Report", type="primary"):
-                pdf_buffer = generate_cma_pdf(prop_data, priority)
+            # The report has been building since scoring; by now it is usually done.
+            # A failed build is resubmitted by generate_cma_pdf() on the next rerun
+            try:
+                pdf_bytes = cma_pdf.result()
+            except Exception as e:
+                st.error(f"CMA report failed: {e}")
+            else:
                 st.download_button(
                     label="📥 Download CMA PDF",
-                    data=pdf_buffer,
+                    data=pdf_bytes,
                     file_name=f"CMA_{prop_data['address'].replace(' ', '_')}.pdf",
-                    mime="application/pdf"
+                    mime="application/pdf",
+                    type="primary"
                 )
             
             st.stop()
     
-    # Dashboard
-    if page == "🏠 Dashboard":
-        st.header("Dashboard")
-        
-        properties_df = get_all_properties()
-        
-        col1, col2, col3, col4, col5 = st.columns(5)
-        
-        with col1:
-            hot_count = len(properties_df[properties_df['priority_tier'] == 'HOT']) if not properties_df.empty else 0
-            st.metric("🔥 Hot Leads", hot_count)
-        
-        with col2:
-            warm_count = len(properties_df[properties_df['priority_tier'] == 'WARM']) if not properties_df.empty else 0
-            st.metric("🌡️ Warm Leads", warm_count)
-        
-        with col3:
-            total_count = len(properties_df)
-            st.metric("🏠 Total Properties", total_count)
-        
-        with col4:
-            total_value = properties_df['list_price'].sum() if not properties_df.empty else 0
-            st.metric("💰 Pipeline Value", f"${total_value/1000000:.1f}M")
-        
-        with col5:
-            avg_score = properties_df['priority_score'].mean() if not properties_df.empty else 0
-            st.metric("📈 Avg Score", f"{avg_score:.0f}")
-        
-        st.markdown("---")
-        st.subheader("🔥 Hot Leads - Contact Today")
-        
-        if not properties_df.empty:
-            hot_leads = properties_df[properties_df['priority_tier'] == 'HOT'].head(6)
-            
-            if not hot_leads.empty:
-                cols = st.columns(3)
-                for idx, (_, prop) in enumerate(hot_leads.iterrows()):
-                    with cols[idx % 3]:
-                        with st.container(border=True):
-                            st.markdown(f"**{prop['address']}**")
-                            st.caption(f"{prop['city']}, MI")
-                            st.markdown(f"💰 ${prop['list_price']:,} | 🎯 Score: **{prop['priority_score']}**")
-                            
-                            if st.button("View Details", key=f"hot_{prop['id']}"):
-                                st.session_state.selected_property = prop['id']
-                                st.rerun()
-            else:
-                st.info("No hot leads yet.")
-    
-    # Property Search
-    elif page == "🔍 Property Search":
-        st.header("Property Search")
-        
-        if not st.session_state.use_mock_data:
-            st.info("🔑 **API Mode Active** - Search real properties")
-            
-            if not st.session_state.api_key:
-                st.warning("⚠️ Enter your API key in the sidebar")
-            else:
-                api_city = st.selectbox("City", list(MICHIGAN_CITIES.keys()), key="api_city")
-                
-                if st.button("🔍 Search RealEstateAPI", type="primary"):
-                    with st.spinner("Searching..."):
-                        api = RealEstateAPI(st.session_state.api_key)
-                        
-                        # Minimal params
-                        params = {
-                            "city": api_city,
-                            "state": "MI",
-                            "size": 25
-                        }
-                        
-                        with st.expander("🔧 Debug: Request"):
-                            st.json(params)
-                        
-                        results = api.property_search(params)
-                        
-                        with st.expander("🔧 Debug: Response"):
-                            st.json(results)
-                        
-                        data = None
-                        if results:
-                            if isinstance(results, list):
-                                data = results
-                            elif results.get('data'):
-                                data = results['data']
-                            elif results.get('results'):
-                                data = results['results']
-                            elif results.get('properties'):
-                                data = results['properties']
-                        
-                        if data and len(data) > 0:
-                            st.success(f"✅ Found {len(data)} properties!")
-                            st.session_state.api_results = data
-                        elif results and results.get('error'):
-                            st.error(f"API Error: {results.get('error')}")
-                        else:
-                            st.warning("No properties found.")
-                
-                st.markdown("---")
-        
-        st.subheader("📋 Saved Properties")
-        
-        properties_df = get_all_properties()
-        
-        if not properties_df.empty:
-            city_filter = st.selectbox("Filter by City", ["All Cities"] + list(properties_df['city'].unique()))
-            
-            filtered_df = properties_df.copy()
-            if city_filter != "All Cities":
-                filtered_df = filtered_df[filtered_df['city'] == city_filter]
-            
-            st.markdown(f"**{len(filtered_df)} properties**")
-            
-            for _, prop in filtered_df.head(20).iterrows():
-                with st.container(border=True):
-                    col1, col2, col3 = st.columns([2, 1, 1])
-                    
-                    with col1:
-                        st.markdown(f"**{prop['address']}**")
-                        st.caption(f"{prop['city']}, MI | {prop['beds']}bd/{prop['baths']}ba | {prop['sqft']:,} sqft")
-                    
-                    with col2:
-                        st.metric("Price", f"${prop['list_price']:,}")
-                    
-                    with col3:
-                        tier_colors = {'HOT': '🔴', 'WARM': '🟠', 'NURTURE': '🔵', 'MONITOR': '⚪'}
-                        st.markdown(f"{tier_colors.get(prop['priority_tier'], '')} {prop['priority_score']}")
-                        if st.button("View", key=f"view_{prop['id']}"):
-                            st.session_state.selected_property = prop['id']
-                            st.rerun()
-    
-    # Priority Queue
-    elif page == "🎯 Priority Queue":
-        st.header("Contact Priority Queue")
-        
-        properties_df = get_all_properties()
-        
-        if not properties_df.empty:
-            tab1, tab2, tab3, tab4 = st.tabs(["🔥 HOT", "🌡️ WARM", "💧 NURTURE", "👀 MONITOR"])
-            
-            with tab1:
-                hot_df = properties_df[properties_df['priority_tier'] == 'HOT']
-                st.markdown(f"**{len(hot_df)} hot leads** - Call TODAY!")
-                for _, prop in hot_df.iterrows():
-                    with st.container(border=True):
-                        col1, col2 = st.columns([3, 1])
-                        with col1:
-                            st.markdown(f"**{prop['address']}** - {prop['city']}")
-                            st.caption(f"💰 ${prop['list_price']:,} | Score: {prop['priority_score']}")
-                            if prop['owner_phone']:
-                                st.markdown(f"📞 {prop['owner_phone']}")
-                        with col2:
-                            if st.button("View", key=f"q_{prop['id']}"):
-                                st.session_state.selected_property = prop['id']
-                                st.rerun()
-            
-            with tab2:
-                warm_df = properties_df[properties_df['priority_tier'] == 'WARM']
-                st.markdown(f"**{len(warm_df)} warm leads**")
-                for _, prop in warm_df.head(10).iterrows():
-                    st.write(f"• {prop['address']} - {prop['city']} - Score: {prop['priority_score']}")
-            
-            with tab3:
-                nurture_df = properties_df[properties_df['priority_tier'] == 'NURTURE']
-                st.markdown(f"**{len(nurture_df)} nurture leads**")
-                for _, prop in nurture_df.head(10).iterrows():
-                    st.write(f"• {prop['address']} - {prop['city']} - Score: {prop['priority_score']}")
-            
-            with tab4:
-                monitor_df = properties_df[properties_df['priority_tier'] == 'MONITOR']
-                st.markdown(f"**{len(monitor_df)} monitor leads**")
-                for _, prop in monitor_df.head(10).iterrows():
-                    st.write(f"• {prop['address']} - {prop['city']} - Score: {prop['priority_score']}")
-    
-    # Pipeline
-    elif page == "📋 Pipeline":
-        st.header("Deal Pipeline")
-        
-        properties_df = get_all_properties()
-        
-        if not properties_df.empty:
-            st.subheader("Pipeline Overview")
-            stage_counts = properties_df['stage'].value_counts()
-            
-            cols = st.columns(len(PIPELINE_STAGES))
-            for idx, stage in enumerate(PIPELINE_STAGES):
-                with cols[idx]:
-                    count = stage_counts.get(stage, 0)
-                    st.metric(stage, count)
-            
-            st.markdown("---")
-            
-            selected_stage = st.selectbox("Filter by Stage", ["All"] + PIPELINE_STAGES)
-            
-            if selected_stage != "All":
-                filtered = properties_df[properties_df['stage'] == selected_stage]
-            else:
-                filtered = properties_df
-            
-            for _, prop in filtered.head(15).iterrows():
-                with st.container(border=True):
-                    col1, col2 = st.columns([2, 1])
-                    with col1:
-                        st.markdown(f"**{prop['address']}** - {prop['city']}")
-                        st.caption(f"${prop['list_price']:,} | Current: {prop['stage']}")
-                    with col2:
-                        new_stage = st.selectbox(
-                            "Move to",
-                            PIPELINE_STAGES,
-                            index=PIPELINE_STAGES.index(prop['stage']) if prop['stage'] in PIPELINE_STAGES else 0,
-                            key=f"pipe_{prop['id']}"
-                        )
-                        if new_stage != prop['stage']:
-                            update_property_stage(prop['id'], new_stage)
-                            st.rerun()
-    
-    # Map View
-    elif page == "🗺️ Map View":
-        st.header("Property Map")
-        
-        properties_df = get_all_properties()
-        
-        if not properties_df.empty:
-            map_tier = st.selectbox("Filter by Tier", ["All", "HOT", "WARM", "NURTURE", "MONITOR"])
-            
-            filtered = properties_df.copy()
-            if map_tier != "All":
-                filtered = filtered[filtered['priority_tier'] == map_tier]
-            
-            st.markdown(f"Showing **{len(filtered)}** properties")
-            
-            m = create_property_map(filtered)
-            st_folium(m, width=None, height=500, use_container_width=True)
-            
-            st.markdown("**Legend:** 🔴 HOT | 🟠 WARM | 🔵 NURTURE | ⚪ MONITOR")
-    
-    # Analytics
-    elif page == "📊 Analytics":
-        st.header("Analytics Dashboard")
-        properties_df = get_all_properties()
-        create_analytics_dashboard(properties_df)
-    
-    # Alerts
-    elif "🔔 Alerts" in page:
-        st.header("🔔 Alerts")
-        
-        alerts_df = get_alerts()
-        
-        if not alerts_df.empty:
-            for _, alert in alerts_df.iterrows():
-                priority_colors = {'high': '🔴', 'medium': '🟡', 'low': '🟢'}
-                is_read = alert['read'] == 1
-                
-                with st.container(border=True):
-                    col1, col2 = st.columns([4, 1])
-                    with col1:
-                        st.markdown(f"{priority_colors.get(alert['priority'], '⚪')} **{alert['title']}**")
-                        st.caption(alert['message'])
-                    with col2:
-                        if not is_read:
-                            if st.button("✓", key=f"alert_{alert['id']}"):
-                                mark_alert_read(alert['id'])
-                                st.rerun()
-        else:
-            st.info("No alerts")
-    
-    # AI Tools
-    elif page == "🤖 AI Tools":
-        st.header("🤖 AI-Powered Tools")
-        
-        tab1, tab2, tab3 = st.tabs(["🏷️ ARV Predictor", "🏘️ Neighborhood Analysis", "📊 Deal Analyzer"])
-        
-        with tab1:
-            st.subheader("AI ARV Prediction")
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                arv_city = st.selectbox("City", list(MICHIGAN_CITIES.keys()))
-                arv_beds = st.number_input("Bedrooms", min_value=1, max_value=6, value=3)
-                arv_baths = st.number_input("Bathrooms", min_value=1.0, max_value=5.0, value=2.0, step=0.5)
-            with col2:
-                arv_sqft = st.number_input("Square Feet", min_value=500, max_value=5000, value=1500)
-                arv_year = st.number_input("Year Built", min_value=1900, max_value=2024, value=1980)
-            
-            if st.button("🔮 Predict ARV", type="primary"):
-                prop_data = {'beds': arv_beds, 'baths': arv_baths, 'sqft': arv_sqft, 'year_built': arv_year}
-                prediction = predict_arv(prop_data, arv_city)
-                
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Predicted ARV", f"${prediction['predicted_arv']:,}")
-                with col2:
-                    st.metric("Confidence", f"{prediction['confidence']}%")
-                with col3:
-                    st.metric("Price/Sqft", f"${prediction['price_per_sqft']}")
-        
-        with tab2:
-            st.subheader("🏘️ Neighborhood Analysis")
-            
-            analysis_city = st.selectbox("Select City", list(MICHIGAN_CITIES.keys()), key="analysis_city")
-            
-            if st.button("🔍 Analyze", type="primary"):
-                analysis = analyze_neighborhood(analysis_city)
-                
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("Score", f"{analysis['score']}/100")
-                    st.metric("Grade", analysis['grade'])
-                with col2:
-                    st.info(analysis['investment_outlook'])
-        
-        with tab3:
-            st.subheader("📊 Deal Analyzer")
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                deal_price = st.number_input("Purchase Price", min_value=0, value=100000, step=5000)
-                deal_arv = st.number_input("Estimated ARV", min_value=0, value=150000, step=5000)
-            with col2:
-                deal_repairs = st.number_input("Estimated Repairs", min_value=0, value=30000, step=5000)
-                deal_holding = st.number_input("Holding Months", min_value=1, max_value=12, value=4)
-            
-            if st.button("📊 Analyze Deal", type="primary"):
-                holding_costs = deal_arv * 0.01 * deal_holding
-                selling_costs = deal_arv * 0.09
-                total_investment = deal_price + deal_repairs + holding_costs + selling_costs
-                net_profit = deal_arv - total_investment
-                roi = (net_profit / total_investment * 100) if total_investment > 0 else 0
-                max_offer = (deal_arv * 0.7) - deal_repairs
-                
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.metric("Max Offer", f"${max_offer:,.0f}")
-                with col2:
-                    st.metric("Total Investment", f"${total_investment:,.0f}")
-                with col3:
-                    st.metric("Net Profit", f"${net_profit:,.0f}")
-                with col4:
-                    st.metric("ROI", f"{roi:.1f}%")
-                
-                if roi >= 20 and net_profit >= 20000:
-                    st.success("✅ GOOD DEAL!")
-                elif roi >= 15:
-                    st.info("👍 DECENT DEAL")
-                elif roi >= 10:
-                    st.warning("⚠️ MARGINAL")
-                else:
-                    st.error("❌ PASS")
-    
-    # Settings
-    elif page == "⚙️ Settings":
-        st.header("Settings")
-        
-        st.subheader("📊 Database")
-        properties_df = get_all_properties()
-        st.info(f"Total properties: {len(properties_df)}")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("🔄 Regenerate Demo Data"):
-                conn = sqlite3.connect(get_db_path())
-                c = conn.cursor()
-                c.execute("DELETE FROM properties")
-                c.execute("DELETE FROM alerts")
-                conn.commit()
-                conn.close()
-                st.session_state.mock_loaded = False
-                st.rerun()
-        
-        with col2:
-            if st.button("🗑️ Clear All Data"):
-                conn = sqlite3.connect(get_db_path())
-                c = conn.cursor()
-                c.execute("DELETE FROM properties")
-                c.execute("DELETE FROM followups")
-                c.execute("DELETE FROM notes")
-                c.execute("DELETE FROM alerts")
-                conn.commit()
-                conn.close()
-                st.success("Data cleared!")
-                st.rerun()
+    # The Alerts label carries an unread count, e.g. "🔔 Alerts (3)"
+    PAGES[page.split(" (")[0]]()
 
 if __name__ == "__main__":
     main()